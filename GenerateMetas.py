@@ -1,11 +1,13 @@
 # %%
-import re
 import json
 import pathlib
+import argparse
+from markers import MarkerCounter
 from data import Data
 
-LING = ['AF', 'NAF', 'PF', 'RF', 'IF', 'BF', 'CF', 'LF', 'GEN']
-LING = [ (re.compile(f"(^{x}$|^{x}[^a-zA-Z]|[^a-zA-Z]{x}$|[^a-zA-Z]{x}[^a-zA-Z])"), x) for x in LING ]
+# Marker inventory counted in story texts
+MARKERS = ['AF', 'NAF', 'PF', 'RF', 'IF', 'BF', 'CF', 'LF', 'GEN']
+MARKER_COUNTER = MarkerCounter(MARKERS)
 
 DATA = Data()
 STORY = pathlib.Path(DATA.story_files_json)
@@ -14,69 +16,109 @@ GRAMMAR = pathlib.Path(DATA.grammar_files_json)
 OUTFILE = DATA.meta
 
 
-def main():
-    # Main function
+def main(markers=MARKERS):
+    # Fallback for GlossProcessor.py, which writes text-meta.json while parsing
+    counter = MarkerCounter(markers)
+    texts = {}
+    for corpus_type, corpus in [('story', STORY), ('sentence', SENTENCE), ('grammar', GRAMMAR)]:
+        for lang in sorted(corpus.iterdir()):
+            texts[(corpus_type, lang.stem)] = [ get_info(text, counter) for text in sorted(lang.glob("*.json")) ]
+    write_meta(build_meta(texts, markers))
+
+
+def build_meta(texts, markers=MARKERS):
+    """Build the structure of text-meta.json
+
+    Parameters
+    ----------
+    texts : dict
+        `{(corpus_type, lang): [info, ...]}` with the `info` of each text
+        as returned by `get_info()`. Story texts are summarized first, then
+        sentence and grammar texts, with languages in sorted order.
+    markers : list, optional
+        Marker inventory the texts were counted with.
+    """
     meta = {}
-    for lang in list(STORY.iterdir()) + list(SENTENCE.iterdir()) + list(GRAMMAR.iterdir()):
-        if lang.stem not in meta:
-            meta[lang.stem] = {
-                'summary': {
-                    "story": {
-                        "iu_num": 0,
-                        "sent_num": 0,
-                        "record_time": 0
-                    },
-                    "sentence": {"sent_num": 0},
-                    "grammar": {"sent_num": 0},
-                    "marker": {}
+    for corpus_type in ['story', 'sentence', 'grammar']:
+        for corpus, lang in sorted(texts):
+            if corpus == corpus_type:
+                add_texts(meta, corpus_type, lang, texts[(corpus, lang)], markers)
+    return meta
+
+
+def add_texts(meta, corpus_type, lang, infos, markers=MARKERS):
+    if lang not in meta:
+        meta[lang] = {
+            'summary': {
+                "story": {
+                    "iu_num": 0,
+                    "sent_num": 0,
+                    "record_time": 0
                 },
-                'text': []
-            }
-
-        for text in lang.glob("*.json"):
-            meta[lang.stem]['text'].append(get_info(text))
-
-        # Get summaries
-        if 'sentence' in str(lang.absolute()):
-            meta[lang.stem]['summary']['sentence']['sent_num'] = sum(
-                t['sent_num'] for t in meta[lang.stem]['text'])
-        elif 'grammar' in str(lang.absolute()):
-            meta[lang.stem]['summary']['grammar']['sent_num'] = sum(
-                t['sent_num'] for t in meta[lang.stem]['text'])
-        elif 'story' in str(lang.absolute()):
-            for k in ['iu_num', 'sent_num', 'record_time']:
-                meta[lang.stem]['summary']['story'][k] = round(
-                    sum(t[k] for t in meta[lang.stem]['text']), 2)
-        
-        # Linguistic marker total counts per language
-        for _, m in LING:
-            meta[lang.stem]['summary']['marker'][m] = sum( t['marker'][m] for t in meta[lang.stem]['text'] )
+                "sentence": {"sent_num": 0},
+                "grammar": {"sent_num": 0},
+                "marker": {}
+            },
+            'text': []
+        }
+
+    meta[lang]['text'] += sorted(infos, key=lambda t: t['file'])
+
+    # Get summaries
+    if corpus_type == 'sentence':
+        meta[lang]['summary']['sentence']['sent_num'] = sum(
+            t['sent_num'] for t in meta[lang]['text'])
+    elif corpus_type == 'grammar':
+        meta[lang]['summary']['grammar']['sent_num'] = sum(
+            t['sent_num'] for t in meta[lang]['text'])
+    elif corpus_type == 'story':
+        for k in ['iu_num', 'sent_num', 'record_time']:
+            meta[lang]['summary']['story'][k] = round(
+                sum(t[k] for t in meta[lang]['text']), 2)
+    
+    # Linguistic marker total counts per language
+    for m in markers:
+        meta[lang]['summary']['marker'][m] = sum( t['marker'][m] for t in meta[lang]['text'] )
 
 
+def write_meta(meta):
     with open(OUTFILE, "w", encoding="utf-8") as f:
         json.dump(meta, f, ensure_ascii=False, indent="\t")
 
 
 
-def get_info(path):
-    text = load_text(path)
+def get_info(path, counter=MARKER_COUNTER):
+    return text_info(load_text(path), path, counter)
+
 
+def text_info(text, path, counter=MARKER_COUNTER):
+    """Statistics of a parsed text
+
+    Parameters
+    ----------
+    text : dict
+        Parsed text, as saved to its per-text JSON (with `s_end`).
+    path : pathlib.Path
+        Path of the per-text JSON, which gives the corpus type and name.
+    counter : markers.MarkerCounter, optional
+        Counts the markers of story texts.
+    """
     info = {}
     # Meta info
     meta = text["meta"]
     info['file'] = f"{path.parent.name}/{path.stem}"
-    for k in ['type', 'speaker', 'collected', 'revised']:
+    keys = ['type', 'speaker', 'collected', 'revised']
+    if DATA.story_dirname in str(path.absolute()) or DATA.grammar_dirname in str(path.absolute()):
+        keys.append('topic')
+    else:
+        pass
+        #info['transcribed'] = meta['Transcribed by']
+    for k in keys:
         try:
             info[k] = meta[k]
         except:
             print(f"WARNRING: no key: `{k}` in meta of {path}")
             pass
-    
-    if DATA.story_dirname in str(path.absolute()) or DATA.grammar_dirname in str(path.absolute()):
-        info['topic'] = meta['topic']
-    else:
-        pass
-        #info['transcribed'] = meta['Transcribed by']
 
     # Text data info
     if DATA.story_dirname in str(path.absolute()):
@@ -93,10 +135,10 @@ def get_info(path):
         info['sent_num'] = len(text["glosses"])
     
     # Linguistic info
-    if info['type'] == 'Sentence' or info['type'] == 'GrammarBook':
-        info["marker"] = { m:0 for _, m in LING }
+    if info.get('type') in ('Sentence', 'GrammarBook'):
+        info["marker"] = { m:0 for m in counter.markers }
     else:
-        info["marker"] = count_markers(text)
+        info["marker"] = counter.count_text(text)
 
     return info
 
@@ -105,20 +147,19 @@ def load_text(path):
     with open(path, encoding="utf-8") as f:
         return json.load(f)
 
-def count_markers(text):
-    markers = { m:0 for _, m in LING}
-    for m in get_markers(text):
-        markers[m] += 1
-    return markers
-
-def get_markers(text):
-    text = text["glosses"]
-    for iu in text:
-        en_tks = [ tk[1] for tk in iu[1]["gloss"]]
-        for pat, marker in LING:
-            for en_tk in en_tks:
-                if pat.search(en_tk):
-                    yield marker
+def count_markers(text, counter=MARKER_COUNTER):
+    return counter.count_text(text)
+
+
+def get_markers(text, counter=MARKER_COUNTER):
+    for iu in text["glosses"]:
+        for tk in iu[1]["gloss"]:
+            yield from counter.token_markers(tk[1])
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Write text-meta.json from the per-text JSON files")
+    parser.add_argument("--markers", default=','.join(MARKERS),
+                        help=f"comma-separated marker inventory (default: {','.join(MARKERS)})")
+    args = parser.parse_args()
+    main(markers=args.markers.split(','))
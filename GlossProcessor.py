@@ -2,11 +2,21 @@ import re
 import json
 import pathlib
 import logging
+import argparse
+import functools
+import collections
+from contextlib import ExitStack
 from datetime import datetime
-from bs4 import UnicodeDammit
+from concurrent.futures import ProcessPoolExecutor
 from utils import get_raw_text_meta
 from tokenizer import align
+from docx_reader import iter_paragraphs
 from data import Data
+from build_cache import BuildManifest, content_digest, source_digest
+from corpus_io import JSONArrayWriter, NormalizedCorpusWriter, ShardedCorpusWriter
+from glossary import GlossaryBuilder
+from corpus_db import CorpusDBWriter
+from GenerateMetas import text_info, build_meta, write_meta
 from urllib.parse import quote
 
 DATA = Data()
@@ -14,50 +24,105 @@ DOCS_FOLDER_PATH = pathlib.Path(DATA.corpus_files_root)
 PUBLIC_DIR = DATA.public
 AUDIO_SERVER = "https://formosanbank.linguistics.ntu.edu.tw/files/audio"
 
+# Bump whenever a change in parsing alters the parsed documents, 
+# so that documents cached by older versions are re-parsed
+PARSER_VERSION = 3
+# Modules the parsed documents depend on: documents cached before any of
+# them changed are re-parsed, even if PARSER_VERSION was not bumped
+PARSER_MODULES = ['GlossProcessor.py', 'tokenizer.py', 'utils.py', 'docx_reader.py', 'data.py']
 
-def main():
+
+def main(workers=1, use_cache=True, ndjson=False, normalized=False, glossary=False, 
+         sqlite=False):
     logging.basicConfig(level=logging.INFO, format='%(message)s', filemode='w', 
                         filename=f'{PUBLIC_DIR}/{DOCS_FOLDER_PATH.stem}.log')
     logging.info(f'{datetime.now().strftime("%Y-%m-%d %H:%M:%S")}\n')
 
-    C = GlossProcessor(docs_folder_path=str(DOCS_FOLDER_PATH))
-
-    # Save as different formats    
-    output_glosses = []
-    for docname, content in C.data.items():
-        public_fp = DATA.get_public_fp(docname)
-        corpLoadPath = strip_path(public_fp)
-        
-        # Save separate file for each text
-        public_fp = pathlib.Path(public_fp)
+    manifest = BuildManifest(DATA.build_manifest, parser_version()) if use_cache else None
+    C = GlossProcessor(docs_folder_path=str(DOCS_FOLDER_PATH), workers=workers, 
+                       manifest=manifest, load=False)
+
+    # Save as different formats, streaming each document as soon as it is parsed
+    texts = collections.defaultdict(list)
+    with ExitStack() as stack:
+        writers = [
+            stack.enter_context(JSONArrayWriter(DATA.all_lang_search)),
+            stack.enter_context(ShardedCorpusWriter(DATA.corpus_shards))
+        ]
+        if ndjson:
+            writers.append(stack.enter_context(JSONArrayWriter(DATA.all_lang_ndjson, ndjson=True)))
+        if normalized:
+            writers.append(stack.enter_context(NormalizedCorpusWriter(DATA.all_lang_normalized)))
+        if glossary:
+            writers.append(stack.enter_context(GlossaryBuilder()))
+        if sqlite:
+            writers.append(stack.enter_context(CorpusDBWriter(DATA.corpus_db)))
+        for docname, content in C.iter_data():
+            # Text statistics need `s_end`, which write_doc() removes
+            public_fp = pathlib.Path(DATA.get_public_fp(docname))
+            texts[(DATA.check_corpus_type(docname), public_fp.parent.name)].append(
+                text_info(content, public_fp))
+            write_doc(C, docname, content, writers, manifest)
+
+    encodings = ', '.join(f"{enc}: {n}" for enc, n in C.encodings.most_common())
+    logging.info(f"\nText file encodings:\t\t\t{encodings}")
+
+    # text-meta.json, without reading back the per-text JSON (as GenerateMetas.py does)
+    write_meta(build_meta(texts))
+
+    if manifest is not None:
+        manifest.save()
+
+
+def parser_version():
+    here = pathlib.Path(__file__).parent
+    return f"{PARSER_VERSION}-{source_digest(here / m for m in PARSER_MODULES)}"
+
+
+def write_doc(C, docname, content, writers, manifest=None):
+    public_fp = DATA.get_public_fp(docname)
+    corpLoadPath = strip_path(public_fp)
+
+    # Save separate file for each text (cached ones are already on disk)
+    public_fp = pathlib.Path(public_fp)
+    if docname not in C.cached:
         public_fp.parent.mkdir(parents=True, exist_ok=True)
         with open(public_fp, "w", encoding="utf-8") as f:
             json.dump(content, f, ensure_ascii=False, separators=(',', ':'))
+        if manifest is not None:
+            manifest.set_outputs(docname, [public_fp])
 
-        # Prepare all_lang.json for full corpus search
-        for gloss_num, gloss in content["glosses"]:
-            gloss.update({
-                'file': corpLoadPath,
-                'num': gloss_num,
-                'meta': { k:v for k, v in gloss["meta"].items() if v != "None" }
-            })
-            del gloss['s_end']
-            output_glosses.append(gloss)
-    
-    # Write flatten data to json
-    with open(DATA.all_lang_search, "w", encoding="utf-8") as f:
-        json.dump(output_glosses, f, ensure_ascii=False, separators=(',', ':'))
+    # Prepare all_lang.json for full corpus search
+    for gloss_num, gloss in content["glosses"]:
+        gloss.update({
+            'file': corpLoadPath,
+            'num': gloss_num,
+            'meta': { k:v for k, v in gloss["meta"].items() if v != "None" }
+        })
+        del gloss['s_end']
+        for w in writers: w.write(gloss)
 
 
 class GlossProcessor:
 
-    def __init__(self, docs_folder_path='.'):
+    def __init__(self, docs_folder_path='.', workers=1, manifest=None, load=True):
         """[summary]
         
         Parameters
         ----------
         docs_folder_path : str, optional
             Path to docx files, defaults to the current dir.
+        workers : int, optional
+            Number of processes used to parse the documents, defaults to 1 
+            (serial). `self.data` and the log are identical in both modes.
+        manifest : build_cache.BuildManifest, optional
+            If given, documents whose content hash matches the manifest 
+            are loaded from their previous output instead of re-parsed, 
+            and the manifest is updated for the parsed ones.
+        load : bool, optional
+            Whether to load all documents into `self.data` on init, 
+            defaults to True. If False, documents are only parsed when 
+            iterating `self.iter_data()` and are not kept in memory.
         
         Notes
         ----------
@@ -100,86 +165,276 @@ class GlossProcessor:
         """
 
         self.data = {}
-        self._load_data(docs_folder_path)
+        self.cached = set()  # documents loaded from the manifest
+        self.encodings = collections.Counter()  # text files per encoding
+        self.workers = workers
+        self.manifest = manifest
+        self.docs_folder_path = docs_folder_path
+        if load:
+            self._load_data(docs_folder_path)
 
 
-    def _load_data(self, path, exts={'.docx', '.txt'}):
+    def _load_data(self, path):
+        for fp, doc in self.iter_data(path):
+            self.data[fp] = doc
+
+
+    def iter_data(self, path=None, exts={'.docx', '.txt'}):
+        """Parse the documents one by one, yielding `(filename, doc)` pairs
+        in the same order and with the same structure as `self.data`
+        """
+        if path is None: path = self.docs_folder_path
         path = pathlib.Path(path)
         
+        fps = []
         for fp in path.rglob('*'):
             if fp.suffix not in exts: continue
             #######################################
             #### Block Bunun_Isbukun 2023.2.19 ####
             # if 'Bunun_Isbukun' in str(fp): continue
             #######################################
-            try:
-                glosses, meta = process_doc(str(fp))
-            except:
-                logging.warning(f"INVALID DOCUMENT formatting:\t\t\t{fp}")
-                continue
-            self.data[str(fp)] = {}
-            self.data[str(fp)]["glosses"] = tokenize_glosses(glosses, str(fp))
-            self.data[str(fp)]["meta"] = meta
+            fps.append(str(fp))
+
+        if self.manifest is not None:
+            self.manifest.prune(fps)
+
+        # Documents are read once, looked up in the build manifest and 
+        # parsed (in a process pool if workers > 1). Their log records are 
+        # buffered and replayed here in document order, so that the log is
+        # the same in every mode. A bounded window of pending documents 
+        # keeps memory from growing with the corpus.
+        with ExitStack() as stack:
+            pool = None
+            if self.workers > 1:
+                pool = stack.enter_context(ProcessPoolExecutor(
+                    max_workers=self.workers, 
+                    initializer=_init_worker, 
+                    initargs=(logging.getLogger().level,)))
+
+            pending = collections.deque()
+            for fp in fps:
+                pending.append(self._submit(fp, pool))
+                if len(pending) > 2 * self.workers - 1:
+                    yield from self._collect(*pending.popleft())
+            while pending:
+                yield from self._collect(*pending.popleft())
+
+
+    def _submit(self, fp, pool):
+        with open(fp, 'rb') as f:
+            content = f.read()
+
+        digest = None
+        if self.manifest is not None:
+            digest = content_digest(content)
+            entry = self.manifest.lookup(fp, digest)
+            if entry is not None:
+                return fp, digest, functools.partial(self._load_cached, fp, entry)
+
+        if pool is not None:
+            return fp, digest, pool.submit(_parse_file_logged, fp, content).result
+        result = _parse_file_logged(fp, content)
+        return fp, digest, lambda: result
+
+
+    def _collect(self, fp, digest, get_result):
+        doc, encoding, records, cached = get_result()
+        if cached:
+            if doc is not None: self.cached.add(fp)
+        elif self.manifest is not None:
+            self.manifest.record(fp, digest, doc is not None, records, encoding)
+
+        if encoding is not None:
+            self.encodings[encoding] += 1
+        for level, msg in records:
+            logging.log(level, msg)
+        if doc is not None:
+            yield fp, doc
+
+
+    def _load_cached(self, fp, entry):
+        doc = self.manifest.load_doc(entry) if entry['valid'] else None
+        return doc, entry.get('encoding'), entry['log'], True
 
 
 
 #--------------- Helper functions -------------------#
-def process_doc(fp):
+def parse_file(fp, content=None):
+    """Parse a document into `{"glosses": [...], "meta": {...}}`
+
+    Returns
+    -------
+    tuple
+        `(doc, encoding)`, where doc is None if the document is invalid
+        and encoding is None for `.docx` files or unreadable files.
+    """
+    encoding = None
+    try:
+        a_doc, encoding = read_doc_lines(fp, content)
+        glosses, meta = parse_doc_lines(a_doc, fp)
+    except:
+        logging.warning(f"INVALID DOCUMENT formatting:\t\t\t{fp}")
+        return None, encoding
+    doc = {
+        "glosses": tokenize_glosses(glosses, fp),
+        "meta": meta
+    }
+    return doc, encoding
+
+
+class _RecordBuffer(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append( (record.levelno, record.getMessage()) )
+
+
+def _init_worker(level):
+    root = logging.getLogger()
+    root.handlers = []
+    root.setLevel(level)
+
+
+def _parse_file_logged(fp, content=None):
+    root = logging.getLogger()
+    buffer = _RecordBuffer()
+    handlers, root.handlers = root.handlers, [buffer]
+    try:
+        doc, encoding = parse_file(fp, content)
+    finally:
+        root.handlers = handlers
+    return doc, encoding, buffer.records, False
+
+
+def process_doc(fp, content=None):
 
     # Normalize document into a list of lines
+    a_doc, _ = read_doc_lines(fp, content)
+
+    return parse_doc_lines(a_doc, fp)
+
+
+def parse_doc_lines(a_doc, fp=''):
+
+    # Parse metadata
+    meta = get_raw_text_meta(a_doc)
+
+    # Get all elicitations in the document
+    glosses = parse_ius(a_doc, meta)
+    if len(glosses) == 0:
+        raise Exception(f"No numbered elicitation found in {fp}")
+    
+    return glosses, meta
+
+
+def read_doc_lines(fp, content=None):
+    """Read a document as a list of stripped lines
+
+    `content` holds the raw bytes of the file if it has already been read.
+    Returns the lines and the text encoding (None for `.docx`).
+    """
+    encoding = None
     if str(fp).endswith('.docx'):
-        from docx import Document
-        d = Document(fp)
-        a_doc = '\n'.join(p.text.strip() for p in d.paragraphs)
-        a_doc = [ line.strip() for line in a_doc.split('\n') ]
+        paragraphs = iter_paragraphs(content if content is not None else fp)
+        a_doc = '\n'.join(p.strip() for p in paragraphs)
     elif str(fp).endswith('.txt'):
-        a_doc, _ = read_with_guessed_encoding(fp)
-        a_doc = [ line.strip() for line in a_doc.split('\n') ]
+        a_doc, encoding = read_with_guessed_encoding(fp, content)
     else:
         raise Exception("Unsupported format. Please provide `.docx` or `.txt`")
+    return [ line.strip() for line in a_doc.split('\n') ], encoding
 
-    # Parse metadata
-    meta = get_raw_text_meta(a_doc)
 
-    # Find the positions of each elicitation
-    pat_start = re.compile(r"^(\d{1,4})\.\s*$")
-    glosses_on = []
-    gloss_num_old = None
-    for i, line in enumerate(a_doc):
-        if pat_start.match(line):
-            gloss_num_new = i
-
-            # Save each elicitation range
-            if gloss_num_old is not None:
-                glosses_on.append( (gloss_num_old, gloss_num_new - 1) )
-            gloss_num_old = gloss_num_new
-    
-    # Save last gloss
-    i = gloss_num_old
-    while True:
-        i += 1
-        if a_doc[i].strip().startswith('#'):
-            if len(a_doc) == i + 1 or (not a_doc[i + 1].strip().startswith('#')):
-                end_idx = i + 1
-                break
-    glosses_on.append( (gloss_num_old, end_idx) )
+PAT_IU_START = re.compile(r"^(\d{1,4})\.\s*$")
+PAT_AUDIO_TIME = re.compile(r'#a ([0-9.]+|None), ([0-9.]+|None), ([0-9.]+|None)')
+IU_FIELDS = ('gloss_lines', 'free_lines', 'audio_times', 'audio_urls')
 
-    # Get all elicitations in the document
+
+def parse_ius(a_doc, meta):
+    """Split a document into IU records in a single pass over its lines
+
+    Every line is classified exactly once, as a number header (`1.`), 
+    a gloss line, a free line (`#e`, `#c`, `#n`...) or an audio line 
+    (`#a`, `#a_url`), and appended to the IU it belongs to. 
+    The line right before a number header is not part of the preceding IU,
+    and the last IU ends with its first block of `#` lines (or at the end
+    of the document if it has none).
+
+    Returns
+    -------
+    list
+        A list of `(gloss_num, iu, meta)`, where iu is a dict with the 
+        keys `gloss_lines`, `free_lines`, `audio_time` and `audio_url`.
+    """
     glosses = []
-    for start, end in glosses_on:
-        gloss_num = int(re.match(r"(\d+)\.", a_doc[start])[1])
-        gloss_lines = [ l.strip() for l in a_doc[(start + 1):end] ]
-        glosses.append( (gloss_num, gloss_lines, meta.copy()) )
-    
-    return glosses, meta
+    iu = None
+    prev = None         # field of the previous line, if it was kept in `iu`
+    prev_hash = False   # whether the previous line starts with `#`
+    for line in a_doc:
+        m = PAT_IU_START.match(line) if line[:1].isdigit() else None
+        if m:
+            if iu is not None:
+                if prev is not None: iu[prev].pop()
+                glosses.append( (iu['num'], close_iu(iu), meta.copy()) )
+            iu = { f: [] for f in IU_FIELDS }
+            iu['num'] = int(m[1])
+            iu['end'] = None
+            prev, prev_hash = None, False
+            continue
+        if iu is None: continue  # Metadata
+
+        is_hash = line.startswith('#')
+        if prev_hash and not is_hash and iu['end'] is None:
+            iu['end'] = { f: len(iu[f]) for f in IU_FIELDS }
+        prev_hash = is_hash
+
+        if line == '':
+            prev = None
+        elif line.startswith('#a'):
+            prev = None
+            times = parse_audio_time(line)
+            if times is not None:
+                prev = 'audio_times'
+                iu[prev].append(times)
+            elif line.startswith('#a_url '):
+                prev = 'audio_urls'
+                iu[prev].append(parse_audio_url(line))
+        elif is_hash:
+            prev = 'free_lines'
+            iu[prev].append(line)
+        else:
+            prev = 'gloss_lines'
+            iu[prev].append(line)
+
+    # The last IU ends with its first block of `#` lines
+    if iu is not None:
+        if iu['end'] is not None:
+            for f in IU_FIELDS:
+                del iu[f][iu['end'][f]:]
+        glosses.append( (iu['num'], close_iu(iu), meta.copy()) )
+
+    return glosses
+
+
+def close_iu(iu):
+    return {
+        'gloss_lines': iu['gloss_lines'],
+        'free_lines': iu['free_lines'],
+        'audio_time': iu['audio_times'][0] if iu['audio_times'] else [None, None, None],
+        'audio_url': iu['audio_urls'][0] if iu['audio_urls'] else None
+    }
 
 
 
 def tokenize_glosses(glosses, filename):
 
     parsed_glosses = []
+    sentences = SentenceSegmenter(filename)
     for gloss_id in range(len(glosses)):
-        gloss_lines, free_lines, audio_lines = assign_gloss_free_lines(glosses[gloss_id][1])
+        iu = glosses[gloss_id][1]
+        gloss_lines = list(iu['gloss_lines'])
 
         # Deal with 3-line and 4-line formats
         num_of_lines = len(gloss_lines) 
@@ -207,31 +462,27 @@ def tokenize_glosses(glosses, filename):
         ori_lang = ori_lang.strip().split()
         tokens = align(ori=rk_gloss.strip(), en=en_gloss.strip(), ch=zh_gloss.strip(), gloss_id=f"{filename}/#{glosses[gloss_id][0]}")
         gloss = [ (tk["ori"], tk["en"], tk["ch"]) for tk in tokens ]
-        free = [ l for l in free_lines if l != '' ]
+        free = iu['free_lines']
 
         # Get sentence audio play time span (if sent end)
-        if '#c' in [ l[:2] for l in free ]:
-            s_end = True  # record this IU's status: last IU in a sentence
-            s_audio_span = get_full_sent_audio_span(glosses, parsed_glosses, audio_lines)
-        else:
-            s_end = False  # record this IU's status: not the last IU in a sentence
-            s_audio_span = None
+        # s_end records this IU's status: last IU in a sentence or not
+        s_end = '#c' in [ l[:2] for l in free ]
+        iu_a_span = [ iu['audio_time'][0], iu['audio_time'][-1] ]
+        s_audio_span = sentences.push(glosses[gloss_id][0], iu_a_span, s_end)
         
         # Save data
-        iu_audio_time = get_audio_time(audio_lines)
         g = {
             'ori': ori_lang,
             'gloss': gloss,
             'free': free,
             's_end': s_end,
-            'iu_a_span': [ iu_audio_time[0], iu_audio_time[-1] ],
+            'iu_a_span': iu_a_span,
             'meta': glosses[gloss_id][2]
         }
         if s_audio_span is not None:
             g['s_a_span'] = s_audio_span
-        audio_url = get_audio_url(audio_lines)
-        if audio_url is not None:
-            g['audio_url'] = audio_url
+        if iu['audio_url'] is not None:
+            g['audio_url'] = iu['audio_url']
         
         parsed_glosses.append( (glosses[gloss_id][0], g) )
     
@@ -239,77 +490,85 @@ def tokenize_glosses(glosses, filename):
 
 
 
-def get_full_sent_audio_span(glosses, parsed_glosses, curr_IU_free_lines):
-    sent_end_iu_idx = [ i for i, g in enumerate(parsed_glosses) if g[1]['s_end'] == True ]
-    if len(sent_end_iu_idx) < 1: 
-        this_sent_start_iu_idx = 0
-    else:
-        this_sent_start_iu_idx = sent_end_iu_idx[-1] + 1
+class SentenceSegmenter:
 
-    sent_starttime = get_audio_time(glosses[this_sent_start_iu_idx][1])[0]
-    sent_endtime = get_audio_time(curr_IU_free_lines)[-1]
+    def __init__(self, filename=''):
+        """Track sentence boundaries over the parsed IUs of a text in one pass
+
+        A sentence starts at the first parsed IU after the previous sentence 
+        end (invalid IUs are skipped) and ends at an IU with a `#c` line.
+        """
+        self.filename = filename
+        self.start = None  # (gloss_num, iu_a_span) of the current sentence's first IU
+
+
+    def push(self, gloss_num, iu_a_span, s_end):
+        """Feed the next parsed IU
+
+        Returns
+        -------
+        list or None
+            The sentence audio span `[start, end]` if the IU ends a sentence 
+            and both times are known, otherwise None.
+        """
+        if self.start is None:
+            self.start = (gloss_num, iu_a_span)
+        if not s_end:
+            return None
+
+        start_num, start_span = self.start
+        self.start = None
+        sent_starttime, sent_endtime = start_span[0], iu_a_span[-1]
+        if sent_starttime is not None and sent_endtime is not None:
+            return [sent_starttime, sent_endtime]
 
-    if sent_starttime is not None and sent_endtime is not None:
-        return [sent_starttime, sent_endtime]
-    else:
         if sent_starttime is None:
-            logging.debug(f"sent start iu idx:\t{glosses[this_sent_start_iu_idx]}")
+            logging.debug(f"No sent start time:\t{self.filename}/#{start_num}")
         else:
-            logging.debug(f"curr_IU_free_lines:\t{curr_IU_free_lines}")
-    
-    return None
+            logging.debug(f"No sent end time:\t{self.filename}/#{gloss_num}")
+        return None
 
 
-def get_audio_time(free_lines):
-    for line in free_lines:
-        if re.match(r'#a ([0-9.]+|None), ([0-9.]+|None), ([0-9.]+|None)', line):
-            times = line.replace('#a ', '').split(', ')
-            times = [ float(t) if t != 'None' else None for t in times ]
-            return times
-    return [None, None, None]
 
-
-def get_audio_url(free_lines):
-    for line in free_lines:
-        if line.startswith("#a_url NO_AUDIO"):
-            return None
-        if re.match(r'#a_url http', line):
-            return line.replace('#a_url ', '')
-        if re.match(r'#a_url ', line):
-            return AUDIO_SERVER + '/' + quote(line.replace('#a_url ', '').strip())
-            
+def parse_audio_time(line):
+    if PAT_AUDIO_TIME.match(line):
+        times = line.replace('#a ', '').split(', ')
+        return [ float(t) if t != 'None' else None for t in times ]
     return None
 
 
-def assign_gloss_free_lines(gloss):
-    free_lines = []
-    gloss_lines = []
-    audio_lines = []
-    
-    for l in gloss:
-        if l == '': 
-            continue
-        elif l.startswith('#a'):
-            audio_lines.append(l)
-        elif l.startswith('#'):
-            free_lines.append(l)
-        else:
-            gloss_lines.append(l)
+def parse_audio_url(line):
+    if line.startswith("#a_url NO_AUDIO"):
+        return None
+    if line.startswith('#a_url http'):
+        return line.replace('#a_url ', '')
+    return AUDIO_SERVER + '/' + quote(line.replace('#a_url ', '').strip())
+
 
-    return gloss_lines, free_lines, audio_lines
 
+def read_with_guessed_encoding(fp: str, content: bytes = None):
+    if content is None:
+        with open(fp, 'rb') as file:
+            content = file.read()
+    text, encoding = decode_bytes(content, fp)
+    return text.strip(), encoding
 
 
-def read_with_guessed_encoding(fp: str):
-    with open(fp, 'rb') as file:
-       content = file.read()
-    suggestion = UnicodeDammit(content)
-    guessed_enc = suggestion.original_encoding
+def decode_bytes(content: bytes, fp: str = ''):
+    """Decode file content, trying strict UTF-8 before guessing the encoding
 
-    if guessed_enc.lower() != "utf-8":
+    bs4 is only imported when the content is not valid UTF-8. Newlines are
+    normalized as when reading the file in text mode.
+    """
+    try:
+        text = content.decode('utf-8')
+        guessed_enc = 'utf-8'
+    except UnicodeDecodeError:
+        from bs4 import UnicodeDammit
+        guessed_enc = UnicodeDammit(content).original_encoding
         logging.warning(f"File {fp} not UTF-8 encoded. Guess: {guessed_enc}")
-    with open(fp, 'r', encoding=guessed_enc) as f:
-        return f.read().strip(), guessed_enc
+        text = content.decode(guessed_enc)
+    return text.replace('\r\n', '\n').replace('\r', '\n'), guessed_enc
 
 
 def strip_path(fp):
@@ -319,4 +578,20 @@ def strip_path(fp):
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Parse raw gloss texts into JSON files")
+    parser.add_argument("-w", "--workers", type=int, default=1, 
+                        help="number of processes used to parse documents (default: 1)")
+    parser.add_argument("--no-cache", action="store_true", 
+                        help="re-parse every document, ignoring the build manifest")
+    parser.add_argument("--ndjson", action="store_true", 
+                        help=f"also write the flattened corpus as NDJSON to {DATA.all_lang_ndjson}")
+    parser.add_argument("--normalized", action="store_true", 
+                        help=f"also write the normalized corpus to {DATA.all_lang_normalized}")
+    parser.add_argument("--glossary", action="store_true", 
+                        help=f"also update the long-text glossary {DATA.glossary}")
+    parser.add_argument("--sqlite", action="store_true", 
+                        help=f"also write the corpus to the SQLite database {DATA.corpus_db}")
+    args = parser.parse_args()
+    main(workers=args.workers, use_cache=not args.no_cache, ndjson=args.ndjson, 
+         normalized=args.normalized, glossary=args.glossary,
+         sqlite=args.sqlite)
@@ -0,0 +1,97 @@
+"""Micro-benchmark of tokenizer.align: per-token cost before and after
+
+    python -m benchmarks.align --texts 100 --ius 300
+"""
+import re
+import time
+import logging
+import argparse
+from benchmarks.synthetic import make_doc_lines
+from GlossProcessor import parse_ius
+from tokenizer import align
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("--texts", type=int, default=100, help="number of synthetic texts")
+    parser.add_argument("--ius", type=int, default=300, help="number of IUs per text")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    glosses = list(synthetic_glosses(args.texts, args.ius))
+    n_tokens = sum(len(g[0].split()) for g in glosses)
+
+    # Alignment semantics must be unchanged
+    for g in glosses:
+        if legacy_align(*g) != align(*g):
+            raise AssertionError(f"align() differs from the legacy alignment on {g}")
+
+    print(f"{len(glosses)} glosses, {n_tokens} tokens")
+    runs = [
+        ("legacy", lambda: [ legacy_align(*g) for g in glosses ]),
+        ("align", lambda: [ align(*g) for g in glosses ]),
+    ]
+    for name, fn in runs:
+        best = min(timeit(fn) for _ in range(args.repeat))
+        print(f"{name:<11} {best:8.3f}s  {1e9 * best / n_tokens:8.0f} ns/token  {n_tokens / best:12,.0f} tokens/s")
+
+
+def timeit(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def synthetic_glosses(n_texts, n_ius):
+    for i in range(n_texts):
+        for num, iu, _ in parse_ius(make_doc_lines(n_ius, seed=i), {}):
+            lines = iu['gloss_lines'][-3:]
+            yield lines[0], lines[1], lines[2], f"synthetic-{i}/#{num}"
+
+
+#--------------- Previous implementation -------------------#
+def legacy_align(ori, en="", ch="", gloss_id=""):
+    ori = [ x for x in ori.strip().split() ]
+    en = [ t for t in en.strip().split() if (t != "." and t != "") ]
+    ch = [ t for t in ch.strip().split() if (t != "." and t != "") ]
+
+    if len(en) != len(ch):
+        logging.warning(f"Diff. num of tokens in EN & CH annot:\t{gloss_id}")
+
+    tokens = [{'ori': ori_tk, 'en': '', 'ch': '', 'is_DM': True} for ori_tk in ori]
+
+    anno_idx = 0
+    for i, ori_tk in enumerate(ori):
+        if anno_idx == len(en) or anno_idx == len(ch):
+            return tokens
+        en_tk = en[anno_idx] if anno_idx < len(en) else ""
+        ch_tk = ch[anno_idx] if anno_idx < len(ch) else ""
+
+        tk = {
+            'ori': ori_tk,
+            'en': '',
+            'ch': '',
+            'is_DM': legacy_is_pureDM(ori_tk)
+        }
+        if legacy_is_pureDM(ori_tk):
+            if en_tk == ori_tk and ch_tk == ori_tk:
+                tk['en'], tk['ch'] = '', ''
+                anno_idx += 1
+        else:
+            tk['en'], tk['ch'] = en_tk, ch_tk
+            anno_idx += 1
+
+        tokens[i] = tk
+
+    return tokens
+
+
+def legacy_is_pureDM(x):
+    if re.match(r'\[X+\]', x): return False
+    if re.match(r'^[^a-z,]+$', x): return True
+    else: return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark docx_reader against python-docx on a large elicitation document
+
+    python -m benchmarks.docx --ius 5000
+"""
+import io
+import time
+import zipfile
+import argparse
+from xml.sax.saxutils import escape
+from benchmarks.synthetic import make_doc_lines
+from docx_reader import iter_paragraphs
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+</Types>"""
+RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("--ius", type=int, default=5000, help="number of IUs in the document")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    args = parser.parse_args()
+
+    content = make_docx(make_doc_lines(args.ius))
+    print(f"{args.ius} IUs, {len(content) / 1e6:.1f} MB .docx")
+
+    runs = [ ("docx_reader", lambda: list(iter_paragraphs(content))) ]
+    try:
+        from docx import Document
+        runs.insert(0, ("python-docx", lambda: [ p.text for p in Document(io.BytesIO(content)).paragraphs ]))
+    except ImportError:
+        print("python-docx not installed, skipping it")
+
+    results = {}
+    for name, fn in runs:
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results[name] = fn()
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:<12} {best:8.3f}s  {len(results[name]) / best:12,.0f} paragraphs/s")
+
+    if len(set(map(tuple, results.values()))) > 1:
+        raise AssertionError("docx_reader and python-docx extract different text")
+
+
+def make_docx(lines):
+    """Build a `.docx` whose body paragraphs are `lines`, with runs split
+    mid-line, tabs, a hyperlink and a table that must not be extracted
+    """
+    body = []
+    for i, line in enumerate(lines):
+        half = len(line) // 2
+        a, b = escape(line[:half]), escape(line[half:])
+        if i % 50 == 0:
+            body.append(f'<w:p><w:r><w:t xml:space="preserve">{a}</w:t></w:r>'
+                        f'<w:hyperlink><w:r><w:t xml:space="preserve">{b}</w:t></w:r></w:hyperlink></w:p>')
+        else:
+            body.append(f'<w:p><w:pPr><w:jc w:val="left"/></w:pPr><w:r><w:rPr><w:b/></w:rPr>'
+                        f'<w:t xml:space="preserve">{a}</w:t></w:r><w:r><w:t xml:space="preserve">{b}</w:t></w:r></w:p>')
+        if i % 500 == 0:
+            body.append('<w:tbl><w:tr><w:tc><w:p><w:r><w:t>cell</w:t></w:r></w:p></w:tc></w:tr></w:tbl>')
+            body.append('<w:p><w:r><w:t>a</w:t><w:tab/><w:t>b</w:t><w:br/><w:t>c</w:t></w:r></w:p>')
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                f'<w:document {NS}><w:body>{"".join(body)}<w:sectPr/></w:body></w:document>')
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('[Content_Types].xml', CONTENT_TYPES)
+        z.writestr('_rels/.rels', RELS)
+        z.writestr('word/document.xml', document)
+    return buf.getvalue()
+
+
+if __name__ == "__main__":
+    main()
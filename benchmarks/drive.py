@@ -0,0 +1,185 @@
+"""Benchmark listing and syncing the Drive corpus tree
+
+    python -m benchmarks.drive --languages 16 --texts 50 --latency 0.01
+
+Runs against an in-memory fake Drive with a fixed latency per request and
+small listing pages. Checks that the serial and concurrent traversals return
+the same tree and visit every page, then counts the requests of a cold sync,
+a sync with no change and a sync after `--changed` files were modified.
+Finally times download_corpus_data.download() with one and `--workers`
+threads, with `--fail-rate` of the requests failing, and checks that a second
+download leaves the files untouched, then that a download interrupted part
+way resumes from the on-disk DownloadCache.
+"""
+import time
+import shutil
+import pathlib
+import argparse
+import tempfile
+from benchmarks.fake_drive import FakeDriveService
+from traverse_files import Drive
+from download_corpus_data import download
+from download_cache import DownloadCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("--languages", type=int, default=16, help="number of language folders per corpus type")
+    parser.add_argument("--texts", type=int, default=50, help="number of .txt files per language folder")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds per request")
+    parser.add_argument("--page-size", type=int, default=20, help="files per listing page")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent requests")
+    parser.add_argument("--changed", type=int, default=5, help="files modified before the last sync")
+    parser.add_argument("--fail-rate", type=float, default=0.02, help="probability of a transient error per request")
+    args = parser.parse_args()
+
+    service = FakeDriveService(latency=args.latency, page_size=args.page_size)
+    root = service.add_tree(n_languages=args.languages, n_texts=args.texts)
+    drive = Drive(service, root_id=root, workers=args.workers)
+
+    runs = [
+        ("serial", lambda: drive.list_child_recursive(root)),
+        (f"concurrent x{args.workers}", lambda: drive.list_child_concurrent(root)),
+    ]
+    trees = []
+    base = None
+    for name, fn in runs:
+        service.requests['list'] = 0
+        start = time.perf_counter()
+        trees.append(fn())
+        seconds = time.perf_counter() - start
+        base = base or seconds
+        print(f"{name:<16} {seconds:8.3f}s  {service.requests['list']:6} requests  x{base / seconds:.2f}")
+
+    if trees[0] != trees[1]:
+        raise AssertionError("concurrent traversal returned a different tree")
+    n_txt = sum(1 for f in service.files_.values() if f['mimeType'] == 'text/plain')
+    listed = drive.list_all_txt()
+    if len(listed) != n_txt or len(set(f['fp'] for f in listed)) != n_txt:
+        raise AssertionError(f"listed {len(listed)} of {n_txt} .txt files")
+
+    # Revalidating the cache from the listing
+    service.latency = 0
+    print(f"\n{'sync':<16} {'list':>6} {'get':>6} {'get_media':>10}")
+    sync(drive, service, "cold")
+    sync(drive, service, "no change")
+    txts = sorted(i for i, f in service.files_.items() if f['mimeType'] == 'text/plain')
+    for id_ in txts[::max(1, len(txts) // args.changed)][:args.changed]:
+        service.modify(id_, f"modified {id_}\n")
+    fetched = sync(drive, service, f"{args.changed} changed")
+    if fetched != args.changed:
+        raise AssertionError(f"fetched {fetched} files, {args.changed} were modified")
+    if any(drive.cache.get(i) != service.content[i].decode('utf-8') for i in txts):
+        raise AssertionError("cached content differs from the drive")
+
+    # Downloading to disk
+    service.latency = args.latency
+    service.fail_rate = args.fail_rate
+    print(f"\n{'download':<16} {'time':>8} {'written':>8} {'unchanged':>10} {'failures':>9}")
+    outdir = tempfile.mkdtemp(prefix="glossParser-drive-")
+    try:
+        base = None
+        for workers in [1, args.workers]:
+            shutil.rmtree(outdir, ignore_errors=True)
+            seconds, stats = timed_download(service, root, outdir, workers)
+            base = base or seconds
+            print(f"{f'x{workers} cold':<16} {seconds:7.3f}s {stats['written']:8} {stats['unchanged']:10} "
+                  f"{service.failures:9}  x{base / seconds:.2f}")
+        check_files(service, root, outdir)
+
+        mtimes = { fp: fp.stat().st_mtime_ns for fp in pathlib.Path(outdir).rglob("*.txt") }
+        seconds, stats = timed_download(service, root, outdir, args.workers)
+        print(f"{f'x{args.workers} rerun':<16} {seconds:7.3f}s {stats['written']:8} {stats['unchanged']:10} "
+              f"{service.failures:9}")
+        if stats['written'] or any(fp.stat().st_mtime_ns != t for fp, t in mtimes.items()):
+            raise AssertionError("unchanged files were rewritten")
+        resume(service, root, outdir, args.workers)
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+
+
+def resume(service, root, outdir, workers):
+    """Interrupt a download, then resume it from the on-disk cache
+    """
+    service.fail_rate = 0
+    cache_dir = pathlib.Path(outdir, "cache")
+    shutil.rmtree(outdir)
+
+    def interrupt(done, total):
+        for i, future in enumerate(done):
+            if i == total // 2: raise KeyboardInterrupt
+            yield future
+
+    with DownloadCache(cache_dir, autosave=10) as cache:
+        drive = Drive(service, root_id=root, workers=workers, cache=cache)
+        try:
+            download(drive, drive.list_all_txt(), outdir, workers=workers, progress=interrupt)
+        except KeyboardInterrupt:
+            pass
+    for k in service.requests: service.requests[k] = 0
+    start = time.perf_counter()
+    with DownloadCache(cache_dir) as cache:
+        opened = time.perf_counter() - start
+        n_cached = len(cache.index)
+        drive = Drive(service, root_id=root, workers=workers, cache=cache)
+        files = drive.list_all_txt()
+        download(drive, files, outdir, workers=workers)
+    print(f"\nresumed with {n_cached} of {len(files)} files cached (opened in {opened * 1000:.1f}ms), "
+          f"fetched {service.requests['get_media']}")
+    if n_cached < len(files) // 2 or service.requests['get_media'] != len(files) - n_cached:
+        raise AssertionError("the interrupted download was not resumed from the cache")
+    shutil.rmtree(cache_dir)
+    check_files(service, root, outdir)
+
+    # Files removed from the drive (the synthetic contents are all distinct)
+    with DownloadCache(cache_dir) as cache:
+        drive = Drive(service, root_id=root, workers=workers, cache=cache)
+        files = drive.list_all_txt()
+        download(drive, files, outdir, workers=workers)
+        cache.retain( txt['id'] for txt in files[10:] )
+        n, _ = cache.gc()
+        if n != 10:
+            raise AssertionError(f"gc removed {n} blobs")
+        if any( cache.get(t['id']) != service.content[t['id']].decode('utf-8') for t in files[10:] ):
+            raise AssertionError("gc removed blobs in use")
+    shutil.rmtree(cache_dir)
+
+
+def timed_download(service, root, outdir, workers):
+    drive = Drive(service, root_id=root, workers=workers, backoff=0.01)
+    service.failures = 0
+    start = time.perf_counter()
+    stats = download(drive, drive.list_all_txt(), outdir, workers=workers)
+    return time.perf_counter() - start, stats
+
+
+def check_files(service, root, outdir):
+    """Check that the files under `outdir` are the .txt files of the drive
+    """
+    n = 0
+    for id_, f in service.files_.items():
+        if f['mimeType'] != 'text/plain': continue
+        parts = []
+        while f['id'] != root:
+            parts.append(f['name'])
+            f = service.files_[f['parents'][0]]
+        if pathlib.Path(outdir, *reversed(parts)).read_bytes() != service.content[id_]:
+            raise AssertionError(f"{'/'.join(reversed(parts))} differs from the drive")
+        n += 1
+    if n != sum(1 for _ in pathlib.Path(outdir).rglob("*") if _.is_file()):
+        raise AssertionError("files not on the drive were written")
+
+
+def sync(drive, service, name):
+    """Fetch the content of every listed .txt file, as download_corpus_data.py does
+    """
+    for k in service.requests: service.requests[k] = 0
+    for txt in drive.list_all_txt():
+        drive.get_file_content(txt['id'])
+    r = service.requests
+    print(f"{name:<16} {r['list']:6} {r['get']:6} {r['get_media']:10}")
+    return r['get_media']
+
+
+if __name__ == "__main__":
+    main()
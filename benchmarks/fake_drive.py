@@ -0,0 +1,164 @@
+"""In-memory stand-in for the Google Drive v3 service used by traverse_files.Drive
+
+    from benchmarks.fake_drive import FakeDriveService
+    service = FakeDriveService(latency=0.05, page_size=100)
+    root = service.add_tree(n_types=3, n_languages=16, n_texts=50)
+    drive = Drive(service, root_id=root)
+
+Supports the calls Drive makes (`files().list/get/get_media`), with a
+fixed latency per request, paginated listings, randomly failing requests and
+a request counter, so the traversal and download code can be run and timed
+offline.
+"""
+import re
+import time
+import random
+import threading
+from datetime import datetime, timedelta
+
+FOLDER = 'application/vnd.google-apps.folder'
+PAT_PARENT = re.compile(r"^'([^']+)' in parents$")
+
+
+class FakeDriveService:
+
+    def __init__(self, latency=0.0, page_size=100, fail_rate=0.0, seed=0):
+        """
+        Parameters
+        ----------
+        latency : float, optional
+            Seconds each request takes, defaults to 0.
+        page_size : int, optional
+            Maximum number of files per listing page, as the Drive API
+            caps `pageSize`, defaults to 100.
+        fail_rate : float, optional
+            Probability that a request fails with a transient error (HTTP
+            503), defaults to 0.
+        seed : int, optional
+            Seed of the random failures.
+        """
+        self.latency = latency
+        self.page_size = page_size
+        self.fail_rate = fail_rate
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self.files_ = {}     # {id: {id, name, mimeType, parents, modifiedTime}}
+        self.content = {}    # {id: bytes}
+        self.requests = {'list': 0, 'get': 0, 'get_media': 0}
+        self._children = {}  # {folder id: [child id, ...]}
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._clock = datetime(2021, 1, 1)
+
+
+    # Building the fake drive
+    def add(self, name, parent=None, content=None, mime_type=None):
+        with self._lock:
+            self._next_id += 1
+            id_ = f"id{self._next_id:06d}"
+        if mime_type is None:
+            mime_type = FOLDER if content is None else 'text/plain'
+        self.files_[id_] = {
+            'id': id_,
+            'name': name,
+            'mimeType': mime_type,
+            'modifiedTime': self._tick(),
+        }
+        if parent is not None:
+            self.files_[id_]['parents'] = [parent]
+            self._children.setdefault(parent, []).append(id_)
+        if content is not None:
+            self.content[id_] = content if isinstance(content, bytes) else content.encode('utf-8')
+        return id_
+
+
+    def add_tree(self, n_types=3, n_languages=4, n_texts=10):
+        """Add a corpus tree `<type>/<Lang_Dialect>/<text>.txt` and return
+        the id of its root folder
+        """
+        root = self.add('corpus')
+        for t in ['story', 'sentence', 'grammar'][:n_types]:
+            type_id = self.add(t, root)
+            for l in range(n_languages):
+                lang_id = self.add(f"Lang{l:02d}_Dialect", type_id)
+                for i in range(n_texts):
+                    self.add(f"text{i:03d}.txt", lang_id, content=f"{t} {l} {i}\n")
+                self.add("notes.docx", lang_id, content=b"", mime_type='application/msword')
+        return root
+
+
+    def modify(self, id_, content):
+        self.content[id_] = content if isinstance(content, bytes) else content.encode('utf-8')
+        self.files_[id_]['modifiedTime'] = self._tick()
+
+
+    def _tick(self):
+        with self._lock:
+            self._clock += timedelta(seconds=1)
+            return self._clock.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+    # Drive API
+    def files(self):
+        return _Files(self)
+
+
+    def _request(self, kind, fn):
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests[kind] += 1
+            fail = self._rng.random() < self.fail_rate
+            self.failures += fail
+        if fail:
+            raise FakeHttpError(503, b'{"error": {"message": "Backend Error"}}')
+        return fn()
+
+
+class FakeHttpError(Exception):
+    """Looks like googleapiclient.errors.HttpError to traverse_files.is_transient()
+    """
+
+    def __init__(self, status, content=b''):
+        super().__init__(f"HTTP {status}")
+        self.resp = type('Response', (), {'status': status})()
+        self.content = content
+
+
+class _Files:
+
+    def __init__(self, service):
+        self.s = service
+
+
+    def list(self, q, pageToken=None, pageSize=None, fields=None, **kwargs):
+        def run():
+            m = PAT_PARENT.match(q)
+            if m is None: raise ValueError(f"Unsupported query: {q}")
+            children = self.s._children.get(m.group(1), [])
+            size = min(pageSize or self.s.page_size, self.s.page_size)
+            start = int(pageToken or 0)
+            resp = {'files': [ dict(self.s.files_[i]) for i in children[start:start + size] ]}
+            if start + size < len(children):
+                resp['nextPageToken'] = str(start + size)
+            return resp
+        return _Request(self.s, 'list', run)
+
+
+    def get(self, fileId, fields=None, **kwargs):
+        return _Request(self.s, 'get', lambda: dict(self.s.files_[fileId]))
+
+
+    def get_media(self, fileId, **kwargs):
+        return _Request(self.s, 'get_media', lambda: self.s.content[fileId])
+
+
+class _Request:
+
+    def __init__(self, service, kind, fn):
+        self.service = service
+        self.kind = kind
+        self.fn = fn
+
+
+    def execute(self):
+        return self.service._request(self.kind, self.fn)
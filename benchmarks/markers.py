@@ -0,0 +1,76 @@
+"""Benchmark single-scan marker counting against one regex per marker
+
+    python -m benchmarks.markers --texts 200 --ius 300
+"""
+import re
+import time
+import random
+import argparse
+from benchmarks.synthetic import make_doc_lines
+from GlossProcessor import parse_ius, tokenize_glosses
+from GenerateMetas import MARKERS
+from markers import MarkerCounter
+
+# Tokens exercising the boundaries of the regex semantics
+EDGE_TOKENS = ['PF', 'PF-eat', 'eat-PF', 'PFV', 'NAF.PF', 'AF=GEN', 'af', 'GENx', '3SG.GEN',
+               'PF-PF', 'IF,', '(CF)', 'LF中', 'BFF', 'xBF', 'RF_RF', '', '.']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("--texts", type=int, default=200, help="number of synthetic texts")
+    parser.add_argument("--ius", type=int, default=300, help="number of IUs per text")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    args = parser.parse_args()
+
+    texts = [ make_text(args.ius, seed=i) for i in range(args.texts) ]
+    n_tokens = sum(len(g[1]['gloss']) for t in texts for g in t['glosses'])
+
+    runs = [
+        ("regex per marker", lambda: [ legacy_count_markers(t) for t in texts ]),
+        # A fresh counter each run, so its token cache starts empty
+        ("single scan", lambda: [ MarkerCounter(MARKERS).count_text(t) for t in texts ]),
+    ]
+    print(f"{args.texts} texts, {n_tokens} tokens, {len(MARKERS)} markers")
+    results = {}
+    base = None
+    for name, fn in runs:
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results[name] = fn()
+            best = min(best, time.perf_counter() - start)
+        base = base or best
+        print(f"{name:<18} {best:8.3f}s  {n_tokens / best:12,.0f} tokens/s  x{base / best:.2f}")
+
+    if results["regex per marker"] != results["single scan"]:
+        raise AssertionError("single-scan marker counts differ from the regex counts")
+
+
+def make_text(n_ius, seed):
+    lines = make_doc_lines(n_ius, seed=seed)
+    glosses = tokenize_glosses(parse_ius(lines, {}), f"story/Synthetic/text{seed}")
+    # Mix in the edge cases, on top of the synthetic glosses
+    rng = random.Random(seed)
+    for _, g in glosses:
+        g['gloss'] = [ (ori, rng.choice(EDGE_TOKENS) if rng.random() < 0.2 else en, ch)
+                       for ori, en, ch in g['gloss'] ]
+    return {"glosses": glosses}
+
+
+# GenerateMetas.get_markers() before the single-scan counter
+LING = [ (re.compile(f"(^{x}$|^{x}[^a-zA-Z]|[^a-zA-Z]{x}$|[^a-zA-Z]{x}[^a-zA-Z])"), x) for x in MARKERS ]
+
+def legacy_count_markers(text):
+    markers = { m:0 for _, m in LING }
+    for iu in text["glosses"]:
+        en_tks = [ tk[1] for tk in iu[1]["gloss"] ]
+        for pat, marker in LING:
+            for en_tk in en_tks:
+                if pat.search(en_tk):
+                    markers[marker] += 1
+    return markers
+
+
+if __name__ == "__main__":
+    main()
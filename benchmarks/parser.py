@@ -0,0 +1,118 @@
+"""Benchmark the single-pass IU parser against the previous multi-scan path
+
+    python -m benchmarks.parser --texts 200 --ius 300
+"""
+import re
+import time
+import argparse
+from urllib.parse import quote
+from benchmarks.synthetic import make_doc_lines
+from GlossProcessor import parse_ius, AUDIO_SERVER
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("--texts", type=int, default=200, help="number of synthetic texts")
+    parser.add_argument("--ius", type=int, default=300, help="number of IUs per text")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    args = parser.parse_args()
+
+    docs = [ make_doc_lines(args.ius, seed=i) for i in range(args.texts) ]
+    n_lines = sum(len(d) for d in docs)
+    n_ius = args.texts * args.ius
+
+    # Both paths must produce the same IUs
+    for d in docs:
+        if legacy_parse(d) != single_pass_parse(d):
+            raise AssertionError("single-pass parser differs from the legacy path")
+
+    print(f"{args.texts} texts, {n_ius} IUs, {n_lines} lines")
+    base = None
+    for name, fn in [ ("legacy", legacy_parse), ("single-pass", single_pass_parse) ]:
+        best = min(timeit(fn, docs) for _ in range(args.repeat))
+        base = base or best
+        print(f"{name:<12} {best:8.3f}s  {n_ius / best:12,.0f} IUs/s  x{base / best:.2f}")
+
+
+def timeit(fn, docs):
+    start = time.perf_counter()
+    for d in docs: fn(d)
+    return time.perf_counter() - start
+
+
+def single_pass_parse(a_doc):
+    return [
+        (num, iu['gloss_lines'], iu['free_lines'], iu['audio_time'], iu['audio_url'])
+        for num, iu, _ in parse_ius(a_doc, {})
+    ]
+
+
+#--------------- Previous implementation -------------------#
+def legacy_parse(a_doc):
+    pat_start = re.compile(r"^(\d{1,4})\.\s*$")
+    glosses_on = []
+    gloss_num_old = None
+    for i, line in enumerate(a_doc):
+        if pat_start.match(line):
+            gloss_num_new = i
+            if gloss_num_old is not None:
+                glosses_on.append( (gloss_num_old, gloss_num_new - 1) )
+            gloss_num_old = gloss_num_new
+
+    i = gloss_num_old
+    while True:
+        i += 1
+        if a_doc[i].strip().startswith('#'):
+            if len(a_doc) == i + 1 or (not a_doc[i + 1].strip().startswith('#')):
+                end_idx = i + 1
+                break
+    glosses_on.append( (gloss_num_old, end_idx) )
+
+    out = []
+    for start, end in glosses_on:
+        gloss_num = int(re.match(r"(\d+)\.", a_doc[start])[1])
+        gloss_lines = [ l.strip() for l in a_doc[(start + 1):end] ]
+        gloss_lines, free_lines, audio_lines = assign_gloss_free_lines(gloss_lines)
+        free = [ l for l in free_lines if l != '' ]
+        out.append( (gloss_num, gloss_lines, free, get_audio_time(audio_lines), get_audio_url(audio_lines)) )
+    return out
+
+
+def get_audio_time(free_lines):
+    for line in free_lines:
+        if re.match(r'#a ([0-9.]+|None), ([0-9.]+|None), ([0-9.]+|None)', line):
+            times = line.replace('#a ', '').split(', ')
+            times = [ float(t) if t != 'None' else None for t in times ]
+            return times
+    return [None, None, None]
+
+
+def get_audio_url(free_lines):
+    for line in free_lines:
+        if line.startswith("#a_url NO_AUDIO"):
+            return None
+        if re.match(r'#a_url http', line):
+            return line.replace('#a_url ', '')
+        if re.match(r'#a_url ', line):
+            return AUDIO_SERVER + '/' + quote(line.replace('#a_url ', '').strip())
+    return None
+
+
+def assign_gloss_free_lines(gloss):
+    free_lines = []
+    gloss_lines = []
+    audio_lines = []
+    for l in gloss:
+        if l == '':
+            continue
+        elif l.startswith('#a'):
+            audio_lines.append(l)
+        elif l.startswith('#'):
+            free_lines.append(l)
+        else:
+            gloss_lines.append(l)
+    return gloss_lines, free_lines, audio_lines
+
+
+if __name__ == "__main__":
+    main()
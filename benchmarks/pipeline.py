@@ -0,0 +1,139 @@
+"""Time each stage of the build on a synthetic corpus and report throughput
+
+    python -m benchmarks.pipeline --languages 4 --texts 10 --ius 200 --scales 1,10
+
+Stages: process_doc (read and split into IUs), tokenize_glosses, align
+alone, the JSON writers (per-text JSON and all_lang.json) and
+GenerateMetas.get_info. Each stage is run once for timing and once under
+tracemalloc for its peak memory.
+"""
+import os
+import time
+import shutil
+import logging
+import pathlib
+import argparse
+import tempfile
+import tracemalloc
+from benchmarks.synthetic import write_tree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("--languages", type=int, default=4, help="number of languages")
+    parser.add_argument("--texts", type=int, default=10, help="number of texts per language and corpus type")
+    parser.add_argument("--ius", type=int, default=200, help="number of IUs per text")
+    parser.add_argument("--scales", default="1",
+                        help="comma-separated multiples of --texts to run, e.g. 1,10")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--keep", help="build the corpus in this directory and keep it")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    for scale in [ int(x) for x in args.scales.split(',') ]:
+        root = args.keep or tempfile.mkdtemp(prefix="glossParser-bench-")
+        try:
+            run(root, args.languages, args.texts * scale, args.ius, not args.no_memory)
+        finally:
+            if not args.keep: shutil.rmtree(root)
+
+
+def run(root, n_languages, n_texts, n_ius, memory=True):
+    files = write_tree(root, n_languages, n_texts, n_ius)
+    size = sum(fp.stat().st_size for fp in files)
+    print(f"\n{len(files)} texts ({n_languages} languages x 3 types x {n_texts} texts x {n_ius} IUs), "
+          f"{size / 1e6:.1f} MB")
+
+    # The build uses paths relative to the repo root (raw-data/, docs/)
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        import GlossProcessor as GP
+        import GenerateMetas as GM
+        from tokenizer import align
+        from corpus_io import JSONArrayWriter
+
+        fps = [ str(fp.relative_to(root)) for fp in files ]
+        state = {}
+
+        def parse(_):
+            state['parsed'] = [ (fp, GP.process_doc(fp)) for fp in fps ]
+            return sum(len(glosses) for _, (glosses, _) in state['parsed'])
+
+        def tokenize(_):
+            state['docs'] = [
+                (fp, {"glosses": GP.tokenize_glosses(glosses, fp), "meta": meta})
+                for fp, (glosses, meta) in state['parsed']
+            ]
+            return count_tokens(state['docs'])
+
+        def align_only(_):
+            n = 0
+            for _, (glosses, _) in state['parsed']:
+                for num, iu, _ in glosses:
+                    lines = iu['gloss_lines'][-3:]
+                    if len(lines) == 3:
+                        n += len(align(*lines))
+            return n
+
+        def fresh_docs():
+            # write_doc() mutates the IUs, so each run writes a fresh copy
+            return [ (fp, copy_doc(doc)) for fp, doc in state['docs'] ]
+
+        def write_json(docs):
+            pathlib.Path(GP.DATA.public).mkdir(exist_ok=True)
+            with JSONArrayWriter(GP.DATA.all_lang_search) as w:
+                C = argparse.Namespace(cached=set())
+                for fp, doc in docs:
+                    GP.write_doc(C, fp, doc, [w])
+                return w.count
+
+        def get_info(_):
+            n = 0
+            for fp, _ in state['docs']:
+                info = GM.get_info(pathlib.Path(GP.DATA.get_public_fp(fp)))
+                n += info.get('iu_num', info['sent_num'])
+            return n
+
+        # (name, stage, unit of throughput, setup excluded from the timing)
+        stages = [
+            ("process_doc", parse, "IUs", None),
+            ("tokenize_glosses", tokenize, "tokens", None),
+            ("align", align_only, "tokens", None),
+            ("JSON writers", write_json, "IUs", fresh_docs),
+            ("get_info", get_info, "IUs", None),
+        ]
+        print(f"{'stage':<18}{'time (s)':>10}{'throughput':>22}{'peak (MB)':>12}")
+        for name, fn, unit, setup in stages:
+            arg = setup() if setup else None
+            start = time.perf_counter()
+            n = fn(arg)
+            elapsed = time.perf_counter() - start
+            peak = measure_peak(fn, setup() if setup else None) if memory else float('nan')
+            print(f"{name:<18}{elapsed:>10.3f}{n / elapsed:>15,.0f} {unit:<6}{peak / 1e6:>12.1f}")
+    finally:
+        os.chdir(cwd)
+
+
+def measure_peak(fn, arg):
+    tracemalloc.start()
+    try:
+        fn(arg)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def count_tokens(docs):
+    return sum( len(g[1]['gloss']) for _, doc in docs for g in doc['glosses'] )
+
+
+def copy_doc(doc):
+    return {
+        "glosses": [ (num, dict(g, meta=dict(g['meta']))) for num, g in doc['glosses'] ],
+        "meta": doc['meta']
+    }
+
+
+if __name__ == "__main__":
+    main()
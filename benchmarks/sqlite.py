@@ -0,0 +1,111 @@
+"""Benchmark lookups in corpus.sqlite against a linear scan of all_lang.json
+
+    python -m benchmarks.sqlite --languages 8 --texts 20 --ius 200
+
+Builds a synthetic corpus, exports it with CorpusDBWriter and runs typical
+lookups both ways. The linear scan is timed with all_lang.json already
+loaded, and the time to load it is reported separately.
+"""
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from benchmarks.synthetic import write_tree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("--languages", type=int, default=8, help="number of languages")
+    parser.add_argument("--texts", type=int, default=20, help="number of texts per language and corpus type")
+    parser.add_argument("--ius", type=int, default=200, help="number of IUs per text")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    root = tempfile.mkdtemp(prefix="glossParser-bench-")
+    cwd = os.getcwd()
+    try:
+        write_tree(root, args.languages, args.texts, args.ius)
+        os.chdir(root)
+        run(args.repeat)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root)
+
+
+def run(repeat):
+    import sqlite3
+    import GlossProcessor as GP
+
+    os.makedirs(GP.DATA.public, exist_ok=True)
+    start = time.perf_counter()
+    GP.main(sqlite=True)
+    print(f"build with --sqlite: {time.perf_counter() - start:.2f}s, "
+          f"corpus.sqlite {os.path.getsize(GP.DATA.corpus_db) / 1e6:.1f} MB, "
+          f"all_lang.json {os.path.getsize(GP.DATA.all_lang_search) / 1e6:.1f} MB")
+
+    start = time.perf_counter()
+    with open(GP.DATA.all_lang_search, encoding="utf-8") as f:
+        ius = json.load(f)
+    print(f"json.load(all_lang.json): {time.perf_counter() - start:.3f}s\n")
+
+    db = sqlite3.connect(GP.DATA.corpus_db)
+    # Real corpora have a long tail of rare forms, the typical lookup
+    form = min(count_forms(ius).items(), key=lambda x: x[1])[0]
+    language = ius[0]['file'].split('/')[-2]
+    lookups = [
+        (f"IUs with form {form!r}",
+            lambda: sorted(set( (iu['file'], iu['num']) for iu in ius
+                                for g in iu['gloss'] if g[0] == form )),
+            lambda: db.execute(
+                "SELECT DISTINCT t.file, i.num FROM tokens k JOIN ius i ON k.iu_id = i.id "
+                "JOIN texts t ON i.text_id = t.id WHERE k.form = ? ORDER BY 1, 2", (form,)).fetchall()),
+        ("tokens glossed with morpheme 1SG",
+            # FTS5 splits on anything but letters and digits, case-insensitively
+            lambda: sum( 1 for iu in ius for g in iu['gloss']
+                         if '1sg' in re.split(r'[\W_]+', g[1].lower()) ),
+            lambda: db.execute(
+                "SELECT count(*) FROM tokens_fts WHERE tokens_fts MATCH 'en:1SG'").fetchone()[0]),
+        (f"form frequencies in {language}",
+            lambda: count_forms(ius, language),
+            lambda: dict(db.execute(
+                "SELECT k.form, count(*) FROM tokens k JOIN ius i ON k.iu_id = i.id "
+                "JOIN texts t ON i.text_id = t.id WHERE t.language = ? GROUP BY k.form",
+                (language,)).fetchall())),
+    ]
+
+    print(f"{'lookup':<36}{'scan (ms)':>12}{'sqlite (ms)':>14}{'speedup':>10}")
+    for name, scan, query in lookups:
+        scan_t, scan_res = best_of(scan, repeat)
+        query_t, query_res = best_of(query, repeat)
+        if isinstance(scan_res, list):
+            scan_res, query_res = list(map(tuple, scan_res)), list(map(tuple, query_res))
+        if scan_res != query_res:
+            raise AssertionError(f"SQLite and the linear scan differ for: {name}")
+        print(f"{name:<36}{scan_t * 1000:>12.1f}{query_t * 1000:>14.1f}{scan_t / query_t:>9.0f}x")
+
+
+def count_forms(ius, language=None):
+    counts = {}
+    for iu in ius:
+        if language is not None and iu['file'].split('/')[-2] != language: continue
+        for g in iu['gloss']:
+            counts[g[0]] = counts.get(g[0], 0) + 1
+    return counts
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    main()
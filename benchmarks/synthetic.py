@@ -0,0 +1,121 @@
+"""Reproducible synthetic texts in the raw gloss format
+
+    python -m benchmarks.synthetic /tmp/synthetic --languages 4 --texts 10 --ius 200
+"""
+import zlib
+import random
+import pathlib
+import argparse
+
+LANGUAGES = ["Seediq_Tgdaya", "Amis_Xiuguluan", "Rukai_Vedai", "Bunun_Isbukun", 
+             "Atayal_Mayrinax", "Paiwan_Southern", "Saisiyat_Tong-he", "Tsou_Tfya"]
+TYPES = { "story": "Narrative", "sentence": "Sentence", "grammar": "GrammarBook" }
+FORMS = ["yaku", "ga=ku", "m-eniq", "n-eyah=ku,_", "alang", "tama=mu", "kumu.\\",
+         "s<m>ekuy", "ka==,_", "m-imah", "qsiya", "baki=na", "[XX]"]
+DMS = ["...(0.8)", "..", "...", "FIL", "eh", "--"]
+EN = ["1SG", "PART=1SG.NOM", "AF-live", "PFV-AF.come=1SG.NOM", "village", 
+      "father=1SG.GEN", "PN", "<AF>cold", "NOM", "AF-drink", "water", 
+      "grandfather=3SG.GEN", "[XX]"]
+CH = ["我", "語助=我.主格", "主焦-住", "完成-主焦.來=我.主格", "部落", 
+      "父親=我.屬格", "人名", "<主焦>冷", "主格", "主焦-喝", "水", 
+      "祖父=他.屬格", "[XX]"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument("root", help="directory in which raw-data/ is created")
+    parser.add_argument("--languages", type=int, default=4, help="number of languages")
+    parser.add_argument("--texts", type=int, default=10, help="number of texts per language and corpus type")
+    parser.add_argument("--ius", type=int, default=200, help="number of IUs per text")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    files = write_tree(args.root, args.languages, args.texts, args.ius, args.seed)
+    print(f"Wrote {len(files)} texts to {pathlib.Path(args.root) / 'raw-data'}")
+
+
+def language_names(n):
+    names = LANGUAGES[:n]
+    for i in range(len(LANGUAGES), n):
+        lang, dialect = LANGUAGES[i % len(LANGUAGES)].split('_')
+        names.append(f"{lang}{i // len(LANGUAGES)}_{dialect}")
+    return names
+
+
+def write_tree(root, n_languages, n_texts, n_ius, seed=0):
+    """Write `raw-data/{story,sentence,grammar}/<Lang_Dialect>/*.txt` under `root`
+
+    Returns
+    -------
+    list
+        Paths of the written texts.
+    """
+    files = []
+    for i, lang in enumerate(language_names(n_languages)):
+        for corpus_type, text_type in TYPES.items():
+            outdir = pathlib.Path(root) / "raw-data" / corpus_type / lang
+            outdir.mkdir(parents=True, exist_ok=True)
+            for j in range(n_texts):
+                text_seed = hash_seed(seed, i, corpus_type, j)
+                lines = make_doc_lines(n_ius, seed=text_seed, story=(corpus_type == "story"), 
+                                       text_type=text_type, language=lang)
+                fp = outdir / f"{lang.split('_')[0][:3]}-{corpus_type}{j}.txt"
+                fp.write_text('\n'.join(lines), encoding="utf-8")
+                files.append(fp)
+    return files
+
+
+def hash_seed(*args):
+    # Stable across runs, unlike hash() on str
+    return zlib.crc32(repr(args).encode("utf-8"))
+
+
+def make_doc_lines(n_ius, seed=0, story=True, text_type=None, language="Seediq_Tgdaya"):
+    """Return the lines of a synthetic text with `n_ius` IUs
+
+    IUs use the 3-line and 4-line gloss formats, a sentence ends (`#e`/`#c`)
+    every few IUs, and story texts carry `#a` time spans and `#a_url` lines.
+    """
+    rnd = random.Random(seed)
+    if text_type is None:
+        text_type = 'Narrative' if story else 'Sentence'
+    lang, dialect = language.split('_')
+    lines = [
+        "topic: synthetic",
+        f"type: {text_type}",
+        f"language: 族語, {lang}, {dialect}",
+        "speaker: 田月嬌, Iwan Kumu, female, 1939",
+        "collected: 2020-01-01",
+        "revised: None",
+        "video: synthetic.mp3",
+        ""
+    ]
+    t = 0.0
+    for num in range(1, n_ius + 1):
+        ori, en, ch = [], [], []
+        for _ in range(rnd.randint(2, 8)):
+            if ori and rnd.random() < 0.2:
+                ori.append(rnd.choice(DMS))
+                continue
+            i = rnd.randrange(len(FORMS))
+            ori.append(FORMS[i])
+            en.append(EN[i])
+            ch.append(CH[i])
+        lines.append(f"{num}.")
+        if rnd.random() < 0.3:
+            lines.append(" ".join(ori))  # 4-line format
+        lines += [ " ".join(ori), " ".join(en), " ".join(ch), "" ]
+        if rnd.random() < 0.35:
+            lines += [ "#e A synthetic free translation.", "#c 合成的自由翻譯。" ]
+        if rnd.random() < 0.05:
+            lines.append("#n a note")
+        if story:
+            dur = round(rnd.uniform(0.5, 4), 2)
+            lines.append(f"#a {t:.2f}, {dur:.2f}, {t + dur:.2f}")
+            t += dur
+        lines.append("#a_url synthetic.mp3" if story else "#a_url NO_AUDIO")
+        lines.append("")
+    return lines
+
+
+if __name__ == "__main__":
+    main()
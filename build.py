@@ -0,0 +1,209 @@
+#%%
+import sys
+import json
+import time
+import pathlib
+import argparse
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from build_cache import file_digest
+from data import Data
+
+DATA = Data()
+
+
+class Stage:
+
+    def __init__(self, name, cmd, inputs=(), outputs=(), deps=(), external=False):
+        """A step of the build
+
+        Parameters
+        ----------
+        name : str
+            Stage name, used on the command line and in the state file.
+        cmd : list
+            Command run from the repo root.
+        inputs, outputs : list
+            Glob patterns of the files the stage reads and writes. The stage
+            is skipped if its inputs (and command) are unchanged since its
+            last successful run and all its outputs exist.
+        deps : list
+            Stages that must finish before this one starts.
+        external : bool
+            Whether the stage reads remote data (Google Drive, Google
+            Sheets), which cannot be fingerprinted: it always runs.
+        """
+        self.name = name
+        self.cmd = cmd
+        self.inputs = inputs
+        self.outputs = outputs
+        self.deps = deps
+        self.external = external
+
+
+    def fingerprint(self):
+        h = hashlib.sha1(json.dumps(self.cmd).encode("utf-8"))
+        for fp in expand(self.inputs):
+            h.update(f"{fp}\0{file_digest(fp)}\0".encode("utf-8"))
+        return h.hexdigest()
+
+
+    def outputs_exist(self):
+        return all( any(pathlib.Path('.').glob(p)) for p in self.outputs )
+
+
+PY = sys.executable
+STAGES = [
+    Stage("download", [PY, "download_corpus_data.py"],
+          outputs=[DATA.corpus_files_root], external=True),
+    Stage("basic_terms", [PY, "basicTerms.py"],
+          outputs=[DATA.grammar_files_raw + "*/A2.txt"], external=True),
+    Stage("parse", [PY, "GlossProcessor.py", "--glossary", "--sqlite"],
+          inputs=[DATA.corpus_files_root + "**/*.txt", DATA.corpus_files_root + "**/*.docx",
+                  "GlossProcessor.py", "GenerateMetas.py", "tokenizer.py", "utils.py", "docx_reader.py",
+                  "corpus_io.py", "glossary.py", "corpus_db.py", "markers.py", "build_cache.py", "data.py"],
+          outputs=[DATA.all_lang_search, DATA.meta, DATA.glossary, DATA.corpus_db,
+                   DATA.corpus_shards + "manifest.json"],
+          deps=["download", "basic_terms"]),
+    Stage("search_index", [PY, "search_index.py"],
+          inputs=[DATA.all_lang_search, "search_index.py", "corpus_io.py"],
+          outputs=[DATA.search_index + "index.json"],
+          deps=["parse"]),
+    Stage("meta_csv", [PY, "GenerateMetasCSV.py"],
+          inputs=[DATA.meta, "GenerateMetasCSV.py"],
+          outputs=[DATA.meta_csv_languages, DATA.meta_csv_texts],
+          deps=["parse"]),
+    Stage("precompress", [PY, "precompress.py"],
+          inputs=[DATA.all_lang_search, DATA.glossary, DATA.corpus_shards + "*.json",
+                  DATA.story_files_json + "**/*.json", DATA.sentence_files_json + "**/*.json",
+                  DATA.grammar_files_json + "**/*.json", "precompress.py"],
+          outputs=[DATA.compression_report],
+          deps=["parse"]),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the corpus data, skipping stages whose inputs are unchanged")
+    parser.add_argument("stages", nargs="*", help="stages to build, with the stages they depend on "
+                        f"(default: all of {', '.join(s.name for s in STAGES)})")
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="stages run at the same time")
+    parser.add_argument("--force", action="store_true", help="run every stage")
+    parser.add_argument("--offline", action="store_true",
+                        help="skip the stages fetching remote data and use the local raw-data/")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = build(STAGES, args.stages or None, jobs=args.jobs, force=args.force, offline=args.offline)
+    print_summary(results, time.perf_counter() - start)
+    if any(status in ("failed", "blocked") for status, _ in results.values()):
+        sys.exit(1)
+
+
+def build(stages, targets=None, jobs=2, force=False, offline=False, state_file=DATA.build_state):
+    """Run the stages needed for `targets` in dependency order
+
+    A stage starts as soon as the stages it depends on are done, so
+    independent stages run concurrently (up to `jobs` at a time).
+    Fingerprints of successful stages are saved to `state_file`.
+
+    Returns
+    -------
+    dict
+        `{stage name: (status, seconds)}` with status one of `ran`,
+        `skipped`, `offline`, `failed` or `blocked` (a dependency failed).
+    """
+    by_name = { s.name: s for s in stages }
+    todo = select(by_name, targets)
+    state = {}
+    if pathlib.Path(state_file).exists():
+        with open(state_file, encoding="utf-8") as f:
+            state = json.load(f)
+
+    results = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while todo or running:
+            for name in list(todo):
+                stage = by_name[name]
+                if any(results.get(d, ("",))[0] in ("failed", "blocked") for d in stage.deps):
+                    results[name] = ("blocked", 0.0)
+                    todo.remove(name)
+                elif all(d in results for d in stage.deps):
+                    todo.remove(name)
+                    running[pool.submit(run_stage, stage, state, force, offline)] = name
+            if not running: continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                status, seconds, fingerprint = future.result()
+                results[name] = (status, seconds)
+                if status == "ran" and fingerprint is not None:
+                    state[name] = fingerprint
+                    save_state(state, state_file)
+
+    return { s.name: results[s.name] for s in stages if s.name in results }
+
+
+def run_stage(stage, state, force=False, offline=False):
+    """Run a stage unless it can be skipped
+
+    Returns
+    -------
+    tuple
+        `(status, seconds, fingerprint)`
+    """
+    start = time.perf_counter()
+    if stage.external:
+        if offline: return "offline", 0.0, None
+        fingerprint = None
+    else:
+        fingerprint = stage.fingerprint()
+        if not force and state.get(stage.name) == fingerprint and stage.outputs_exist():
+            return "skipped", time.perf_counter() - start, fingerprint
+
+    print(f"[{stage.name}] {' '.join(stage.cmd[1:])}", flush=True)
+    returncode = subprocess.call(stage.cmd)
+    status = "ran" if returncode == 0 else "failed"
+    return status, time.perf_counter() - start, fingerprint
+
+
+def select(by_name, targets):
+    """Names of the target stages and of all the stages they depend on
+    """
+    if targets is None: return set(by_name)
+    selected = set()
+    stack = list(targets)
+    while stack:
+        name = stack.pop()
+        if name not in by_name:
+            raise Exception(f"Unknown stage: {name}")
+        if name in selected: continue
+        selected.add(name)
+        stack += by_name[name].deps
+    return selected
+
+
+def expand(patterns):
+    files = set()
+    for p in patterns:
+        files.update( fp for fp in pathlib.Path('.').glob(p) if fp.is_file() )
+    return sorted(files)
+
+
+def save_state(state, state_file):
+    pathlib.Path(state_file).parent.mkdir(parents=True, exist_ok=True)
+    with open(state_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent="\t")
+
+
+def print_summary(results, wall_time):
+    print(f"\n{'stage':<16}{'status':<10}{'time (s)':>10}")
+    for name, (status, seconds) in results.items():
+        print(f"{name:<16}{status:<10}{seconds:>10.2f}")
+    print(f"{'wall time':<26}{wall_time:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
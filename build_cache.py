@@ -0,0 +1,133 @@
+import json
+import hashlib
+import pathlib
+
+
+def file_digest(fp):
+    with open(fp, 'rb') as f:
+        return content_digest(f.read())
+
+
+def content_digest(content: bytes):
+    return hashlib.sha1(content).hexdigest()
+
+
+def source_digest(fps):
+    """Digest of the source of the given modules, in the given order
+    """
+    h = hashlib.sha1()
+    for fp in fps:
+        h.update(f"{pathlib.Path(fp).name}\0{file_digest(fp)}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+class BuildManifest:
+
+    def __init__(self, path, parser_version):
+        """Persistent record of what was built from each source file
+
+        Parameters
+        ----------
+        path : str
+            Path to the manifest JSON file. It is created on `save()` if
+            it does not exist yet.
+        parser_version : str
+            Version of the parser (see `GlossProcessor.parser_version()`).
+            Entries recorded by other versions are never reused.
+
+        Notes
+        ----------
+        self.files structure:
+
+        {
+        'raw-data/story/Seediq_Tgdaya/sdqNr-mother_iwan.txt': {
+            'hash': '3f786850e387550fdab836ed7e6dc881de23001b',
+            'version': '3-5d41402abc4b2a76b9719d911017c592ae5f2a1c',
+            'valid': True,  # False if the document could not be parsed
+            'encoding': 'utf-8',  # None for .docx
+            'outputs': ['docs/story/Seediq_Tgdaya/sdqNr-mother_iwan.json'],
+            'log': [
+                [30, 'Diff. num of tokens in EN & CH annot:\t...'],
+                ...
+            ]
+        },
+        ...
+        }
+        """
+        self.path = pathlib.Path(path)
+        self.parser_version = parser_version
+        self.files = {}
+        self._previous = {}  # {src: outputs of the entry replaced by record()}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+
+    def lookup(self, src, digest):
+        """Return the entry of `src` if it can be reused, otherwise None
+        """
+        entry = self.files.get(src)
+        if entry is None: return None
+        if entry['hash'] != digest or entry['version'] != self.parser_version:
+            return None
+        if entry['valid'] and len(entry['outputs']) == 0:
+            return None
+        for out in entry['outputs']:
+            if not pathlib.Path(out).exists(): return None
+        return entry
+
+
+    def load_doc(self, entry):
+        with open(entry['outputs'][0], encoding="utf-8") as f:
+            return json.load(f)
+
+
+    def record(self, src, digest, valid, log, encoding=None):
+        """Record the parse of `src`, replacing its previous entry
+
+        Outputs of the previous entry are deleted if the document is now
+        invalid, or by `set_outputs()` if it no longer produces them, so
+        that no untracked output is left behind.
+        """
+        old = self.files.get(src)
+        self._previous[src] = old['outputs'] if old is not None else []
+        if not valid:
+            self._remove_previous(src, [])
+        self.files[src] = {
+            'hash': digest,
+            'version': self.parser_version,
+            'valid': valid,
+            'encoding': encoding,
+            'outputs': [],
+            'log': [ list(r) for r in log ]
+        }
+
+
+    def set_outputs(self, src, outputs):
+        self.files[src]['outputs'] = [ str(o) for o in outputs ]
+        self._remove_previous(src, self.files[src]['outputs'])
+
+
+    def _remove_previous(self, src, keep):
+        for out in self._previous.pop(src, []):
+            if out not in keep:
+                pathlib.Path(out).unlink(missing_ok=True)
+
+
+    def prune(self, srcs):
+        """Drop entries of source files that no longer exist, and their outputs
+        """
+        srcs = set(srcs)
+        for src in list(self.files):
+            if src not in srcs:
+                for out in self.files.pop(src)['outputs']:
+                    pathlib.Path(out).unlink(missing_ok=True)
+
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({
+                "parser_version": self.parser_version,
+                "files": self.files
+            }, f, ensure_ascii=False, indent="\t")
@@ -0,0 +1,290 @@
+#%%
+import re
+import os
+import time
+import pickle
+import argparse
+from array import array
+from collections import namedtuple
+from corpus_io import load_all_lang
+from data import Data
+
+DATA = Data()
+TABLES_VERSION = 1
+FIELDS = ('form', 'en', 'ch')
+GAP = '...'
+ANY = '*'
+
+PAT_COND = re.compile(r'^(form|en|ch)([:~])(.+)$')
+PAT_MORPHEME = re.compile(r'[-=.]+')
+
+Hit = namedtuple('Hit', ['file', 'num', 'start', 'end', 'iu'])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Keyword-in-context search over the parsed corpus",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""pattern syntax:
+  A sequence of tokens separated by spaces, matched within a single IU.
+  Each token is one or more conditions joined by '&':
+    form:yaku     the field equals the value (forms are case-insensitive)
+    en~PF         one of the morphemes (split on - = .) equals the value
+    ch:/^我/      the field matches the regular expression
+  '*' matches any single token and '...' any number of tokens.
+
+examples:
+  python concordance.py "en~PF ... en~1SG"
+  python concordance.py "form:/^m-/" --language Seediq --type story""")
+    parser.add_argument("pattern", help="token pattern")
+    parser.add_argument("--language", action="append",
+                        help="only search Lang_Dialect directories containing this (repeatable)")
+    parser.add_argument("--type", action="append", choices=["story", "sentence", "grammar"],
+                        help="only search this corpus type (repeatable)")
+    parser.add_argument("--layer", default="form", choices=FIELDS, help="tier shown in the lines")
+    parser.add_argument("--width", type=int, default=5, help="context tokens on each side")
+    parser.add_argument("--limit", type=int, default=50, help="lines printed, 0 for all")
+    parser.add_argument("--corpus", default=DATA.all_lang_search, help="all_lang.json to search")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the token tables")
+    args = parser.parse_args()
+
+    table = load_tables(args.corpus, DATA.concordance_tables, rebuild=args.rebuild)
+    start = time.perf_counter()
+    try:
+        hits = table.search(args.pattern, languages=args.language, types=args.type)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+
+    shown = hits if args.limit == 0 else hits[:args.limit]
+    for hit in shown:
+        left, kw, right = table.kwic(hit, width=args.width, layer=args.layer)
+        print(f"{hit.file}#{hit.num}\t{left:>50} [ {kw} ] {right}")
+    print(f"\n{len(hits)} hits in {elapsed * 1000:.1f} ms" +
+          (f" (first {len(shown)} shown)" if len(shown) < len(hits) else ''))
+
+
+class TokenTable:
+
+    def __init__(self, ius):
+        """Token tables of the corpus for concordance queries
+
+        Every token of every IU (the `gloss` of IUs in all_lang.json) is
+        stored by position in flat integer columns, one per field, holding
+        ids into the vocabulary of that field. Each vocabulary entry also
+        has a posting list of the token positions where it occurs, so a
+        query only evaluates its conditions once per distinct string and
+        then visits the matching tokens.
+
+        Parameters
+        ----------
+        ius : list
+            IUs as in all_lang.json.
+        """
+        self.files = []
+        self.iu_file = array('I')
+        self.iu_num = array('I')
+        self.iu_start = array('I')   # first token of each IU, plus the end
+        self.token_iu = array('I')
+        self.vocab = { f: [] for f in FIELDS }
+        self.columns = { f: array('I') for f in FIELDS }
+        self.postings = { f: [] for f in FIELDS }
+
+        file_ids = {}
+        ids = { f: {} for f in FIELDS }
+        for iu in ius:
+            if iu['file'] not in file_ids:
+                file_ids[iu['file']] = len(self.files)
+                self.files.append(iu['file'])
+            iu_idx = len(self.iu_num)
+            self.iu_file.append(file_ids[iu['file']])
+            self.iu_num.append(iu['num'])
+            self.iu_start.append(len(self.token_iu))
+            for token in iu['gloss']:
+                pos = len(self.token_iu)
+                self.token_iu.append(iu_idx)
+                for field, s in zip(FIELDS, token):
+                    i = ids[field].get(s)
+                    if i is None:
+                        i = ids[field][s] = len(self.vocab[field])
+                        self.vocab[field].append(s)
+                        self.postings[field].append(array('I'))
+                    self.columns[field].append(i)
+                    self.postings[field][i].append(pos)
+        self.iu_start.append(len(self.token_iu))
+
+
+    def search(self, pattern, languages=None, types=None):
+        """Find the token sequences matching `pattern`
+
+        Parameters
+        ----------
+        pattern : str or list
+            Token pattern (see `parse_pattern()`).
+        languages : list, optional
+            Keep IUs whose Lang_Dialect directory contains one of these
+            (case-insensitive), defaults to all.
+        types : list, optional
+            Keep IUs of these corpus types (story, sentence, grammar),
+            defaults to all.
+
+        Returns
+        -------
+        list
+            `Hit(file, num, start, end, iu)` in corpus order; `start` and
+            `end` are the token positions of the match within the IU and
+            `iu` the index of the IU in the tables.
+        """
+        items = parse_pattern(pattern) if isinstance(pattern, str) else pattern
+        items = [ self._compile(item) for item in items ]
+        anchor = next(i for i, item in enumerate(items) if item not in (ANY, GAP))
+        if GAP in items[:anchor]:
+            raise ValueError("A pattern cannot start with '...'")
+
+        files = self._select_files(languages, types)
+        hits = []
+        for pos in self._candidates(items[anchor]):
+            iu = self.token_iu[pos]
+            if files is not None and self.iu_file[iu] not in files: continue
+            iu_start, iu_end = self.iu_start[iu], self.iu_start[iu + 1]
+            start = pos - anchor
+            if start < iu_start: continue
+            end = self._match(items, 0, start, iu_end)
+            if end is not None:
+                hits.append(Hit(self.files[self.iu_file[iu]], self.iu_num[iu],
+                                start - iu_start, end - iu_start, iu))
+        return hits
+
+
+    def kwic(self, hit, width=5, layer='form'):
+        """Left context, keyword and right context of a hit, as strings
+        """
+        iu = hit.iu
+        base = self.iu_start[iu]
+        end = self.iu_start[iu + 1]
+        vocab, col = self.vocab[layer], self.columns[layer]
+        text = lambda a, b: ' '.join(vocab[col[i]] for i in range(a, b))
+        return (
+            text(max(base, base + hit.start - width), base + hit.start),
+            text(base + hit.start, base + hit.end),
+            text(base + hit.end, min(end, base + hit.end + width))
+        )
+
+
+    def _compile(self, item):
+        """Turn the conditions of a pattern item into sets of vocabulary ids
+        """
+        if item in (ANY, GAP): return item
+        compiled = []
+        for field, op, value in item:
+            vocab = self.vocab[field]
+            if op == 're':
+                pat = re.compile(value, re.IGNORECASE if field == 'form' else 0)
+                ok = lambda s: pat.search(s) is not None
+            elif op == 'morpheme':
+                ok = lambda s: value in PAT_MORPHEME.split(s)
+            elif field == 'form':
+                ok = lambda s: s.lower() == value.lower()
+            else:
+                ok = lambda s: s == value
+            compiled.append( (field, set( i for i, s in enumerate(vocab) if ok(s) )) )
+        return compiled
+
+
+    def _candidates(self, conds):
+        # Start from the condition matching the fewest tokens
+        field, ids = min(conds, key=lambda c: sum(len(self.postings[c[0]][i]) for i in c[1]))
+        positions = [ p for i in ids for p in self.postings[field][i] ]
+        positions.sort()
+        return positions
+
+
+    def _token_ok(self, conds, pos):
+        return all( self.columns[field][pos] in ids for field, ids in conds )
+
+
+    def _match(self, items, k, pos, iu_end):
+        """Match `items[k:]` from token `pos`, returning the end position of
+        the shortest match or None
+        """
+        if k == len(items): return pos
+        item = items[k]
+        if item == GAP:
+            for p in range(pos, iu_end + 1):
+                end = self._match(items, k + 1, p, iu_end)
+                if end is not None: return end
+            return None
+        if pos >= iu_end: return None
+        if item != ANY and not self._token_ok(item, pos): return None
+        return self._match(items, k + 1, pos + 1, iu_end)
+
+
+    def _select_files(self, languages, types):
+        if languages is None and types is None: return None
+        files = set()
+        for i, file in enumerate(self.files):
+            parts = file.split('/')
+            if types is not None and parts[0] not in types: continue
+            if languages is not None and not any(l.lower() in parts[-2].lower() for l in languages):
+                continue
+            files.add(i)
+        return files
+
+
+def parse_pattern(pattern):
+    """Parse a pattern string into a list of items
+
+    Items are `'*'`, `'...'` or a list of `(field, op, value)` conditions,
+    with `op` one of `exact`, `morpheme` or `re`:
+
+        "en~PF ... form:/^m-/&ch:吃"
+        -> [[('en', 'morpheme', 'PF')], '...',
+            [('form', 're', '^m-'), ('ch', 'exact', '吃')]]
+    """
+    items = []
+    for token in pattern.split():
+        if token in (ANY, GAP):
+            items.append(token)
+            continue
+        conds = []
+        for cond in token.split('&'):
+            m = PAT_COND.match(cond)
+            if m is None:
+                raise ValueError(f"Invalid condition: {cond}")
+            field, op, value = m.groups()
+            if op == '~':
+                conds.append( (field, 'morpheme', value) )
+            elif len(value) > 1 and value.startswith('/') and value.endswith('/'):
+                conds.append( (field, 're', value[1:-1]) )
+            else:
+                conds.append( (field, 'exact', value) )
+        items.append(conds)
+    if all(item in (ANY, GAP) for item in items):
+        raise ValueError("A pattern needs at least one token with conditions")
+    return items
+
+
+def load_tables(corpus=DATA.all_lang_search, cache=DATA.concordance_tables, rebuild=False):
+    """Load the token tables of `corpus`, building them if the cached
+    tables are missing or older than the corpus
+    """
+    stat = os.stat(corpus)
+    stamp = (TABLES_VERSION, os.path.abspath(corpus), stat.st_size, stat.st_mtime_ns)
+    if not rebuild and os.path.exists(cache):
+        with open(cache, 'rb') as f:
+            cached = pickle.load(f)
+        if cached['stamp'] == stamp:
+            # Stored as plain attributes, so the cache does not depend on
+            # the module the class was pickled from
+            table = TokenTable.__new__(TokenTable)
+            table.__dict__.update(cached['tables'])
+            return table
+
+    table = TokenTable(load_all_lang(corpus))
+    with open(cache, 'wb') as f:
+        pickle.dump({'stamp': stamp, 'tables': table.__dict__}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return table
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#%%
+import os
+import sys
+import json
+import sqlite3
+import logging
+import argparse
+from corpus_io import load_all_lang
+from tokenizer import is_DM_token
+from data import Data
+
+DATA = Data()
+# Rows buffered before each executemany()
+BATCH_ROWS = 50000
+
+SCHEMA = """
+CREATE TABLE texts (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE,      -- story/Seediq_Tgdaya/sdqNr-mother_iwan
+    type TEXT NOT NULL,             -- story, sentence or grammar
+    language TEXT NOT NULL,         -- Seediq_Tgdaya
+    meta TEXT NOT NULL              -- JSON object
+);
+CREATE TABLE ius (
+    id INTEGER PRIMARY KEY,
+    text_id INTEGER NOT NULL REFERENCES texts(id),
+    num INTEGER NOT NULL,
+    ori TEXT NOT NULL,              -- original line(s), tokens joined by spaces
+    free TEXT NOT NULL,             -- JSON array of the free translation lines
+    iu_a_start REAL,
+    iu_a_end REAL,
+    s_a_start REAL,
+    s_a_end REAL,
+    audio_url TEXT
+);
+CREATE TABLE tokens (
+    id INTEGER PRIMARY KEY,
+    iu_id INTEGER NOT NULL REFERENCES ius(id),
+    pos INTEGER NOT NULL,
+    form TEXT NOT NULL,
+    en TEXT NOT NULL,
+    ch TEXT NOT NULL,
+    is_dm INTEGER NOT NULL
+);
+"""
+
+# Created once the tables are loaded, which is faster than maintaining
+# them row by row
+INDEXES = [
+    # IU numbers are not unique within a text (e.g. `1.` repeated)
+    "CREATE INDEX ius_text_num ON ius(text_id, num)",
+    "CREATE INDEX tokens_iu ON tokens(iu_id, pos)",
+    "CREATE INDEX tokens_form ON tokens(form)",
+    "CREATE INDEX texts_language ON texts(language)",
+    """CREATE VIRTUAL TABLE tokens_fts USING fts5(
+        form, en, ch, content='tokens', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 0'
+    )""",
+    "INSERT INTO tokens_fts(tokens_fts) VALUES('rebuild')",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export all_lang.json to an SQLite database")
+    parser.add_argument("--corpus", default=DATA.all_lang_search, help="all_lang.json to export")
+    parser.add_argument("--out", default=DATA.corpus_db, help="database file")
+    args = parser.parse_args()
+
+    with CorpusDBWriter(args.out) as w:
+        for iu in load_all_lang(args.corpus):
+            w.write(iu)
+    if w.error is not None:
+        sys.exit(f"Failed to write {args.out}: {w.error}")
+    print(f"{w.count} IUs written to {args.out}")
+
+
+class CorpusDBWriter:
+
+    def __init__(self, fp):
+        """Write IUs (as in all_lang.json) to an SQLite database
+
+        Tables (see `SCHEMA`):
+
+            texts   one row per document, with its meta as JSON
+            ius     one row per IU, with audio spans, audio_url and free lines
+            tokens  one row per token of the IU gloss
+            tokens_fts
+                    FTS5 index over the form, en and ch of tokens; the
+                    default tokenizer splits on `-`, `=` and `.`, so morphemes
+                    can be matched: `tokens_fts MATCH 'en:PF'`
+
+        Everything is loaded in a single transaction into a temporary file,
+        which replaces `fp` once the indexes are built. If building them
+        fails, the temporary file is removed and the error is logged and
+        kept in `self.error` rather than raised, so the other outputs of
+        the build are still written.
+        """
+        self.fp = str(fp)
+        self.count = 0
+        self.error = None
+        self._tmp = self.fp + '.tmp'
+        if os.path.exists(self._tmp): os.remove(self._tmp)
+        self._db = sqlite3.connect(self._tmp, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.executescript(SCHEMA)
+        self._db.execute("BEGIN")
+        self._text_ids = {}
+        self._ius = []
+        self._tokens = []
+        self._n_tokens = 0
+
+
+    def write(self, item):
+        text_id = self._text_ids.get(item['file'])
+        if text_id is None:
+            text_id = self._text_ids[item['file']] = len(self._text_ids) + 1
+            parts = item['file'].split('/')
+            self._db.execute("INSERT INTO texts VALUES (?, ?, ?, ?, ?)", (
+                text_id, item['file'], parts[0], parts[-2],
+                json.dumps(item['meta'], ensure_ascii=False)
+            ))
+
+        self.count += 1
+        iu_a_span = item.get('iu_a_span') or [None, None]
+        s_a_span = item.get('s_a_span') or [None, None]
+        self._ius.append((
+            self.count, text_id, item['num'], ' '.join(item['ori']),
+            json.dumps(item['free'], ensure_ascii=False),
+            iu_a_span[0], iu_a_span[-1], s_a_span[0], s_a_span[-1],
+            item.get('audio_url')
+        ))
+        for pos, (form, en, ch) in enumerate(item['gloss']):
+            self._n_tokens += 1
+            self._tokens.append( (self._n_tokens, self.count, pos, form, en, ch, is_DM_token((form, en, ch))) )
+        if len(self._tokens) >= BATCH_ROWS:
+            self._flush()
+
+
+    def _flush(self):
+        self._db.executemany("INSERT INTO ius VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self._ius)
+        self._db.executemany("INSERT INTO tokens VALUES (?, ?, ?, ?, ?, ?, ?)", self._tokens)
+        self._ius = []
+        self._tokens = []
+
+
+    def close(self):
+        try:
+            self._flush()
+            for sql in INDEXES:
+                self._db.execute(sql)
+        except sqlite3.Error as e:
+            self.error = e
+            logging.error(f"Failed to write {self.fp}: {e}")
+            self.abort()
+            return
+        self._db.execute("COMMIT")
+        self._db.close()
+        os.replace(self._tmp, self.fp)
+
+
+    def abort(self):
+        self._db.close()
+        os.remove(self._tmp)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+if __name__ == "__main__":
+    main()
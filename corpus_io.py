@@ -0,0 +1,299 @@
+import os
+import json
+import pathlib
+from build_cache import file_digest
+
+NORMALIZED_FORMAT = "all_lang-normalized"
+NORMALIZED_VERSION = 1
+SHARDS_VERSION = 1
+NUMBER_CHARS = set('0123456789.eE+-')
+
+
+class JSONArrayWriter:
+
+    def __init__(self, fp, ndjson=False):
+        """Write a JSON array to disk one item at a time
+
+        The output is byte-identical to
+        `json.dump(items, f, ensure_ascii=False, separators=(',', ':'))`.
+        With `ndjson=True`, one item is written per line instead, without
+        the enclosing brackets.
+        The file is written to a temporary path and only moved to `fp`
+        once closed successfully, so an interrupted build never leaves a
+        truncated file behind.
+        """
+        self.fp = str(fp)
+        self.ndjson = ndjson
+        self.count = 0
+        self._tmp = self.fp + '.tmp'
+        self._f = open(self._tmp, "w", encoding="utf-8")
+        if not self.ndjson:
+            self._f.write(self._head())
+
+
+    def write(self, item):
+        s = json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+        if self.ndjson:
+            self._f.write(s + '\n')
+        else:
+            if self.count > 0: self._f.write(',')
+            self._f.write(s)
+        self.count += 1
+
+
+    def _head(self):
+        return '['
+
+
+    def _tail(self):
+        return ']'
+
+
+    def close(self):
+        if not self.ndjson:
+            self._f.write(self._tail())
+        self._f.close()
+        os.replace(self._tmp, self.fp)
+
+
+    def abort(self):
+        self._f.close()
+        os.remove(self._tmp)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class NormalizedCorpusWriter(JSONArrayWriter):
+
+    def __init__(self, fp):
+        """Write IUs of all_lang.json in the normalized format
+
+        Takes the same IUs as `JSONArrayWriter` but stores the `file` and 
+        `meta` of each document once, in a document table that IUs refer to
+        by integer id:
+
+        {
+            "format": "all_lang-normalized",
+            "version": 1,
+            "ius": [
+                {"ori": [...], "gloss": [...], "free": [...], "iu_a_span": [...],
+                 "doc": 0, "num": 1},
+                ...
+            ],
+            "docs": [
+                {"file": "story/Seediq_Tgdaya/sdqNr-mother_iwan", "meta": {...}},
+                ...
+            ]
+        }
+
+        `expand_normalized()` converts it back to the flat format.
+        """
+        self.docs = []
+        self._doc_ids = {}
+        super().__init__(fp)
+
+
+    def _head(self):
+        return '{"format":"%s","version":%d,"ius":[' % (NORMALIZED_FORMAT, NORMALIZED_VERSION)
+
+
+    def _tail(self):
+        docs = json.dumps(self.docs, ensure_ascii=False, separators=(',', ':'))
+        return '],"docs":' + docs + '}'
+
+
+    def write(self, item):
+        key = (item['file'], json.dumps(item['meta'], ensure_ascii=False))
+        if key not in self._doc_ids:
+            self._doc_ids[key] = len(self.docs)
+            self.docs.append({'file': item['file'], 'meta': item['meta']})
+
+        iu = {}
+        for k, v in item.items():
+            if k == 'meta':
+                iu['doc'] = self._doc_ids[key]
+            elif k != 'file':
+                iu[k] = v
+        super().write(iu)
+
+
+class ShardedCorpusWriter:
+
+    def __init__(self, outdir):
+        """Split the IUs of all_lang.json into one file per language
+
+        IUs are routed by the `Lang_Dialect` directory of their `file` to
+        `<outdir>/<Lang_Dialect>.json`, each a JSON array in the format of
+        all_lang.json. Once all shards are written, `<outdir>/manifest.json`
+        lists them so that clients can fetch only the languages they need
+        and cache shards by hash:
+
+        {
+            "version": 1,
+            "shards": {
+                "Seediq_Tgdaya": {
+                    "file": "Seediq_Tgdaya.json",
+                    "ius": 1520,
+                    "bytes": 2310044,
+                    "sha1": "3f786850e387550fdab836ed7e6dc881de23001b"
+                },
+                ...
+            }
+        }
+
+        Shards of languages no longer in the corpus are removed.
+        """
+        self.outdir = pathlib.Path(outdir)
+        self.outdir.mkdir(parents=True, exist_ok=True)
+        self.shards = {}
+
+
+    def write(self, item):
+        lang = item['file'].split('/')[-2]
+        if lang not in self.shards:
+            self.shards[lang] = JSONArrayWriter(self.outdir / f"{lang}.json")
+        self.shards[lang].write(item)
+
+
+    def close(self):
+        manifest = {}
+        for lang in sorted(self.shards):
+            w = self.shards[lang]
+            w.close()
+            manifest[lang] = {
+                "file": pathlib.Path(w.fp).name,
+                "ius": w.count,
+                "bytes": os.path.getsize(w.fp),
+                "sha1": file_digest(w.fp)
+            }
+        for fp in self.outdir.glob("*.json"):
+            if fp.stem != "manifest" and fp.stem not in manifest:
+                fp.unlink()
+        with open(self.outdir / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump({"version": SHARDS_VERSION, "shards": manifest}, f, 
+                      ensure_ascii=False, indent="\t")
+
+
+    def abort(self):
+        for w in self.shards.values():
+            w.abort()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def expand_normalized(data):
+    """Convert the normalized format back to the flat list of all_lang.json
+    """
+    if data.get("format") != NORMALIZED_FORMAT:
+        raise Exception("Not a normalized all_lang file")
+    if data["version"] > NORMALIZED_VERSION:
+        raise Exception(f"Unsupported normalized format version: {data['version']}")
+
+    docs = data["docs"]
+    out = []
+    for iu in data["ius"]:
+        g = {}
+        for k, v in iu.items():
+            if k == 'doc':
+                g['meta'] = dict(docs[v]['meta'])
+            elif k != 'num':
+                g[k] = v
+        g['file'] = docs[iu['doc']]['file']
+        g['num'] = iu['num']
+        out.append(g)
+    return out
+
+
+def iter_json_array(fp, chunk_size=2**16):
+    """Yield the items of a JSON array file one at a time
+
+    Only the current item and a chunk of the file are held in memory, so
+    arrays larger than memory can be processed.
+    """
+    decoder = json.JSONDecoder()
+    with open(fp, encoding="utf-8") as f:
+        buf = f.read(chunk_size).lstrip()
+        eof = buf == ''
+        if not buf.startswith('['):
+            raise Exception(f"Not a JSON array: {fp}")
+        idx = 1
+        need_sep = False
+        while True:
+            # Skip whitespace and the separator before the next item
+            while idx < len(buf) and buf[idx] in ' \t\r\n':
+                idx += 1
+            if idx < len(buf):
+                if buf[idx] == ']':
+                    return
+                if need_sep:
+                    if buf[idx] != ',':
+                        raise Exception(f"Invalid JSON array: {fp}")
+                    idx += 1
+                    need_sep = False
+                    continue
+                try:
+                    item, end = decoder.raw_decode(buf, idx)
+                    # A number may continue in the next chunk (`1` of `1.5`)
+                    if eof or (end < len(buf) and buf[end] not in NUMBER_CHARS):
+                        yield item
+                        idx = end
+                        need_sep = True
+                        continue
+                except json.JSONDecodeError:
+                    if eof: raise
+            elif eof:
+                raise Exception(f"Truncated JSON array: {fp}")
+
+            chunk = f.read(chunk_size)
+            eof = chunk == ''
+            buf = buf[idx:] + chunk
+            idx = 0
+
+
+def load_all_lang(fp):
+    """Load all_lang.json, or its normalized version, as a flat list of IUs
+    """
+    with open(fp, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return expand_normalized(data)
+    return data
+
+
+def load_shards(outdir, languages=None):
+    """Load the IUs of some languages from the per-language shards
+
+    Parameters
+    ----------
+    outdir : str
+        Directory written by `ShardedCorpusWriter`.
+    languages : list, optional
+        `Lang_Dialect` names to load, defaults to all languages.
+    """
+    outdir = pathlib.Path(outdir)
+    with open(outdir / "manifest.json", encoding="utf-8") as f:
+        shards = json.load(f)["shards"]
+    ius = []
+    for lang, shard in shards.items():
+        if languages is not None and lang not in languages: continue
+        with open(outdir / shard["file"], encoding="utf-8") as f:
+            ius += json.load(f)
+    return ius
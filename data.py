@@ -9,15 +9,30 @@ class Data:
     sentence_files_raw = "raw-data/sentence/"
     grammar_files_raw = "raw-data/grammar/"
 
+    # Local caches, not published
+    concordance_tables = "raw-data/concordance.pkl"
+
     # Publish files
     public = "docs/"
     all_lang_search = "docs/all_lang.json"
+    all_lang_ndjson = "docs/all_lang.ndjson"
+    all_lang_normalized = "docs/all_lang.norm.json"
+    corpus_shards = "docs/corpus/"
+    search_index = "docs/index/"
+    token_columns = "docs/columns/"
+    corpus_db = "docs/corpus.sqlite"
+    glossary = "docs/all_lang-long-text-glossary.json"
     story_files_json = "docs/story/"
     sentence_files_json = "docs/sentence/"
     grammar_files_json = "docs/grammar/"
     meta = "docs/text-meta.json"
     meta_csv_languages = "docs/meta/langMetas.csv"
     meta_csv_texts = "docs/meta/txtMetas.csv"
+    build_manifest = "docs/build-manifest.json"
+    build_state = "docs/build-state.json"
+    glossary_state = "docs/glossary-state.json"
+    compression_report = "docs/compression-report.json"
+    download_cache = "docs/download-cache/"
 
     # Generated
     story_dirname = story_files_raw.split('/')[1]
@@ -1,45 +1,18 @@
 #%%
-import json
+import sys
+import pathlib
 
-def main():
-    # Read all data
-    with open("all_lang-long-text.json") as f:
-        glosses = json.load(f)
-
-    with open("all_lang-long-text-glossary.json") as f:
-        glossary = json.load(f)
-
-    # Filter
-    seediq_glosses = filter_glosses(glosses, "賽德克")
-    seediq_glossary = filter_glossary(glossary, "Seediq")
-
-    # Save results
-    with open("seediq-long-text.json", "w") as f:
-        json.dump(seediq_glosses, f, ensure_ascii=False)
-    with open("seediq-long-text-glossary.json", "w") as f:
-        json.dump(seediq_glossary, f, ensure_ascii=False)
+# Run from docs/, with the extractor in the repo root
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from extract_languages import extract
 
 
-def filter_glosses(glosses, key='賽德克'):
-    return [ g for g in glosses if key in g['meta']['language'] ]
-
-
-def filter_glossary(glossary, key='Seediq'):
-    filtered_glossary = []
+def main():
+    # Writes seediq-long-text.json and seediq-long-text-glossary.json
+    extract(["Seediq"], corpus="all_lang-long-text.json",
+            glossary="all_lang-long-text-glossary.json", outdir=".")
 
-    for g in glossary:
-        new_sense = {}
-        for sense, locations in g[1].items():
-            seediq_loc = [ l for l in locations if l.startswith('Seediq') ]
-            if len(seediq_loc) > 0:
-                new_sense[sense] = seediq_loc
-        if len(new_sense) > 0:
-            g[1] = new_sense
-            filtered_glossary.append(g)
-        
-    return filtered_glossary
-            
 
 #%%
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
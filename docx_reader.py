@@ -0,0 +1,71 @@
+import io
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+# Run children with a text value besides `w:t`, as in python-docx
+RUN_TEXT = {
+    W + 'tab': '\t',
+    W + 'ptab': '\t',
+    W + 'cr': '\n',
+    W + 'noBreakHyphen': '-',
+}
+
+
+def iter_paragraphs(docx):
+    """Yield the text of each paragraph in the body of a `.docx` file
+
+    `word/document.xml` is streamed out of the zip with an incremental XML
+    parser, so memory does not grow with the document. The text matches
+    `p.text for p in docx.Document(docx).paragraphs` of python-docx:
+    only top-level body paragraphs (not those inside tables) and the runs
+    directly in them or in their hyperlinks.
+
+    Parameters
+    ----------
+    docx : str, bytes or file-like
+        Path to the `.docx` file, or its content.
+    """
+    if isinstance(docx, bytes):
+        docx = io.BytesIO(docx)
+
+    with zipfile.ZipFile(docx) as z, z.open('word/document.xml') as f:
+        path = []    # tags from the document root to the current element
+        parts = []   # text of the current paragraph
+        body = None
+        for event, elem in iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                path.append(elem.tag)
+                if len(path) == 2 and elem.tag == W + 'body':
+                    body = elem
+                continue
+
+            path.pop()
+            depth = len(path)
+            if depth == 2:
+                # Free every finished body child (w:p, w:tbl, w:sdt, ...)
+                body.remove(elem)
+                if elem.tag == W + 'p':
+                    yield ''.join(parts)
+                    parts = []
+            elif depth >= 4 and in_paragraph_run(path):
+                if elem.tag == W + 't':
+                    parts.append(elem.text or '')
+                elif elem.tag == W + 'br':
+                    if elem.get(W + 'type', 'textWrapping') == 'textWrapping':
+                        parts.append('\n')
+                elif elem.tag in RUN_TEXT:
+                    parts.append(RUN_TEXT[elem.tag])
+
+
+def in_paragraph_run(path):
+    """Whether `path` ends in a run of a body paragraph (w:p/w:r or
+    w:p/w:hyperlink/w:r)
+    """
+    if path[2] != W + 'p': return False
+    if len(path) == 4:
+        return path[3] == W + 'r'
+    if len(path) == 5:
+        return path[3] == W + 'hyperlink' and path[4] == W + 'r'
+    return False
@@ -0,0 +1,211 @@
+#%%
+import os
+import json
+import pickle
+import pathlib
+import argparse
+import threading
+from build_cache import content_digest
+from data import Data
+
+DATA = Data()
+CACHE_VERSION = 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the download cache of the Google Drive files")
+    parser.add_argument("--root", default=DATA.download_cache, help=f"cache directory (default: {DATA.download_cache})")
+    parser.add_argument("--import-pickle", metavar="FP", help="add the files of a cache.pkl from older versions")
+    parser.add_argument("--gc", action="store_true", help="remove the blobs no file refers to")
+    args = parser.parse_args()
+
+    with DownloadCache(args.root) as cache:
+        if args.import_pickle:
+            n = cache.import_pickle(args.import_pickle)
+            print(f"Imported {n} files from {args.import_pickle}")
+        if args.gc:
+            n, size = cache.gc()
+            print(f"Removed {n} blobs ({size:,} bytes)")
+        print(f"{len(cache.index)} files in {args.root}")
+
+
+class DownloadCache:
+
+    def __init__(self, root=DATA.download_cache, autosave=200):
+        """Content-addressed store of downloaded files
+
+        Each distinct content is stored once, in a blob named after its
+        sha1 (`objects/3f/786850e3...`), and `index.json` maps the Drive
+        file ids to their blob:
+
+            {"version": 1, "files": {
+                "<file id>": {"hash": "3f7868...", "modifiedTime": "2021-...", "path": "story/..."}
+            }}
+
+        Only the index is read when opening the cache; blobs are read when
+        their content is asked for. Blobs are written before the index
+        refers to them, and both are written to a temporary file then
+        moved into place, so an interrupted run leaves a consistent cache
+        with every file downloaded up to the last save.
+
+        Parameters
+        ----------
+        root : str, optional
+            Cache directory, created if missing. With `None`, blobs are
+            kept in memory and nothing is written to disk.
+        autosave : int, optional
+            Save the index every `autosave` new entries (0 to save only on
+            `save()` and `close()`).
+        """
+        self.root = None if root is None else pathlib.Path(root)
+        self.autosave = autosave
+        self.index = {}  # {id: {hash, modifiedTime, path}}
+        self._blobs = {}  # {hash: bytes}, in-memory cache only
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        if self.root is not None and (self.root / "index.json").exists():
+            with open(self.root / "index.json", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == CACHE_VERSION:
+                self.index = index["files"]
+
+
+    def entry(self, file_id):
+        """`{hash, modifiedTime, path}` of a cached file, or None
+        """
+        return self.index.get(file_id)
+
+
+    def get(self, file_id):
+        """Cached content of a file, or None
+        """
+        entry = self.index.get(file_id)
+        if entry is None: return None
+        if self.root is None:
+            data = self._blobs[entry['hash']]
+        else:
+            try:
+                data = self._blob_path(entry['hash']).read_bytes()
+            except FileNotFoundError:
+                return None
+        return data.decode('utf-8')
+
+
+    def put(self, file_id, content, modified_time, path=None):
+        """Store the content of a file
+
+        Parameters
+        ----------
+        file_id : str
+            Drive file id.
+        content : str
+            File content.
+        modified_time : str
+            `modifiedTime` of the file when its content was fetched.
+        path : str, optional
+            Path of the file in the corpus tree, for reference.
+        """
+        data = content.encode('utf-8')
+        hash_ = content_digest(data)
+        if self.root is None:
+            self._blobs[hash_] = data
+        else:
+            fp = self._blob_path(hash_)
+            if not fp.exists():
+                fp.parent.mkdir(parents=True, exist_ok=True)
+                tmp = fp.with_name(f"{fp.name}.{threading.get_ident()}.tmp")
+                tmp.write_bytes(data)
+                os.replace(tmp, fp)
+
+        with self._lock:
+            self.index[file_id] = {"hash": hash_, "modifiedTime": modified_time, "path": path}
+            self._unsaved += 1
+            save = self.autosave and self._unsaved >= self.autosave
+        if save: self.save()
+
+
+    def retain(self, file_ids):
+        """Drop the entries of the files not in `file_ids` (e.g. deleted from
+        the Drive), so that `gc()` can remove their blobs
+        """
+        file_ids = set(file_ids)
+        with self._lock:
+            for file_id in [ i for i in self.index if i not in file_ids ]:
+                del self.index[file_id]
+                self._unsaved += 1
+
+
+    def save(self):
+        """Write the index atomically
+        """
+        if self.root is None: return
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.root / "index.json.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "files": self.index}, f, ensure_ascii=False, indent="\t")
+            os.replace(tmp, self.root / "index.json")
+            self._unsaved = 0
+
+
+    def gc(self):
+        """Remove the blobs not referred to by the index, and leftover temporary files
+
+        Returns
+        -------
+        tuple
+            `(number of files removed, bytes freed)`
+        """
+        used = set( e['hash'] for e in self.index.values() )
+        if self.root is None:
+            orphans = set(self._blobs) - used
+            size = sum( len(self._blobs.pop(h)) for h in orphans )
+            return len(orphans), size
+
+        n, size = 0, 0
+        for fp in (self.root / "objects").glob("*/*"):
+            if fp.name.endswith(".tmp") or fp.parent.name + fp.name not in used:
+                size += fp.stat().st_size
+                fp.unlink()
+                n += 1
+        for d in (self.root / "objects").glob("*"):
+            if d.is_dir() and not any(d.iterdir()): d.rmdir()
+        return n, size
+
+
+    def import_pickle(self, fp):
+        """Add the files of a `cache.pkl` (`{'folders': {...}, 'file_content': {...}}`)
+
+        Files whose `modifiedTime` is unknown are skipped, since they
+        could not be revalidated.
+        """
+        with open(fp, "rb") as f:
+            cache = pickle.load(f)
+        n = 0
+        for file_id, content in cache['file_content'].items():
+            meta = cache['folders'].get(file_id)
+            if meta is None or file_id in self.index: continue
+            self.put(file_id, content, meta['modifiedTime'])
+            n += 1
+        return n
+
+
+    def _blob_path(self, hash_):
+        return self.root / "objects" / hash_[:2] / hash_[2:]
+
+
+    def close(self):
+        if self._unsaved: self.save()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        # Keep what was downloaded even if the run failed
+        self.close()
+
+
+if __name__ == "__main__":
+    main()
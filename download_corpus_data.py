@@ -1,55 +1,117 @@
 #%%
-import re
 import os
-import pickle
 import pathlib
-import tqdm
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from traverse_files import Drive
+from download_cache import DownloadCache
 from data import Data
 
-USE_CACHE = False
-
 # Output data
-CACHE = 'docs/cache.pkl'
+CACHE = Data().download_cache
 DATA_DIR = Data().corpus_files_root
 
 # Setup GDrive API
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 SERVICE_ACCOUNT_FILE = 'form-corp-data.json'
-credentials = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-drive_service = build('drive', 'v3', credentials=credentials)
-drive = Drive(drive_service)
 
-# Load cache
-if USE_CACHE:
-    os.system("wget https://yongfu.name/glossParser/cache.pkl")
-    os.system("mv cache.pkl docs/")
-    with open(CACHE, "rb") as f:
-        cache = pickle.load(f)
-    drive.read_cache(**cache)
 
+def main():
+    parser = argparse.ArgumentParser(description="Download the corpus .txt files from Google Drive to raw-data/")
+    parser.add_argument("-j", "--workers", type=int, default=8, help="concurrent requests")
+    args = parser.parse_args()
+    import tqdm
 
-# Search GDrive for all txt files
-corpus_files = drive.list_all_txt()
+    # The cache is saved even if the download fails part way
+    with DownloadCache(CACHE) as cache:
+        drive = connect(workers=args.workers, cache=cache)
 
-# Write files to local
-for txt in tqdm.tqdm(corpus_files):
+        # Search GDrive for all txt files
+        corpus_files = drive.list_all_txt()
+
+        # Write files to local
+        stats = download(drive, corpus_files, DATA_DIR, workers=args.workers, progress=tqdm.tqdm)
+        print(f"{stats['written']} files written, {stats['unchanged']} unchanged")
+
+        # Forget the files removed from the Drive
+        cache.retain( txt['id'] for txt in corpus_files )
+        cache.save()
+        n, size = cache.gc()
+        if n: print(f"Removed {n} cached blobs ({size:,} bytes)")
+
+
+def connect(workers=8, cache=None):
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+
+    credentials = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+    new_service = lambda: build('drive', 'v3', credentials=credentials)
+    return Drive(new_service(), service_factory=new_service, workers=workers, cache=cache)
 
-    # Get paths
-    path = pathlib.Path(DATA_DIR) / txt['fp']
-    path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Write file
-    fcontent = drive.get_file_content(txt['id'])
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(fcontent)
+def download(drive, files, outdir=DATA_DIR, workers=8, progress=None):
+    """Fetch Drive files concurrently and write them under `outdir`
+
+    Parameters
+    ----------
+    drive : traverse_files.Drive
+        Drive whose cached content is reused if not modified.
+    files : list
+        `[{'id', 'fp'}, ...]` as returned by `Drive.list_all_txt()`.
+    outdir : str, optional
+        Directory the `fp` of the files are relative to.
+    workers : int, optional
+        Number of files fetched at the same time.
+    progress : callable, optional
+        Wraps the iterator of fetched files, e.g. `tqdm.tqdm`.
+
+    Returns
+    -------
+    dict
+        `{'written': n, 'unchanged': n}`. Files whose content on disk is
+        already up to date are not rewritten, so their mtime is kept.
+    """
+    stats = {'written': 0, 'unchanged': 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = { pool.submit(drive.get_file_content, txt['id'], txt['fp']): txt for txt in files }
+        done = as_completed(futures)
+        if progress is not None:
+            done = progress(done, total=len(futures))
+        try:
+            for future in done:
+                txt = futures[future]
+                path = pathlib.Path(outdir) / txt['fp']
+                if write_if_changed(path, future.result()):
+                    stats['written'] += 1
+                else:
+                    stats['unchanged'] += 1
+        except BaseException:
+            # Stop at the first error (or Ctrl-C) rather than fetching the rest
+            # (by hand: shutdown(cancel_futures=True) needs Python 3.9)
+            for f in futures:
+                f.cancel()
+            raise
+    return stats
+
+
+def write_if_changed(path, content):
+    """Write text to a file unless it already has this content
+
+    Returns
+    -------
+    bool
+        Whether the file was written.
+    """
+    data = content.encode('utf-8')
+    path = pathlib.Path(path)
+    if path.exists() and path.stat().st_size == len(data) and path.read_bytes() == data:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
 
 
-# Save cache
-with open(CACHE, "wb") as f:
-    pickle.dump({
-        'folders': drive.folders,
-        'file_content': drive.file_content,
-        }, f)
+if __name__ == "__main__":
+    main()
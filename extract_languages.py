@@ -0,0 +1,104 @@
+#%%
+import pathlib
+import argparse
+from contextlib import ExitStack
+from corpus_io import JSONArrayWriter, iter_json_array
+from data import Data
+
+DATA = Data()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract language subsets of the corpus and the glossary")
+    parser.add_argument("languages", nargs="+",
+                        help="languages to extract, as Lang or Lang_Dialect (e.g. Seediq, Amis_Xiuguluan)")
+    parser.add_argument("--corpus", default=DATA.all_lang_search, help="corpus JSON array (all_lang.json)")
+    parser.add_argument("--glossary", default=DATA.glossary, help="glossary JSON array, skipped if missing")
+    parser.add_argument("--outdir", default=DATA.public, help="output directory")
+    args = parser.parse_args()
+
+    glossary = args.glossary if pathlib.Path(args.glossary).exists() else None
+    counts = extract(args.languages, args.corpus, glossary, args.outdir)
+    for lang in args.languages:
+        print(f"{lang}:\t{counts[lang][0]} IUs, {counts[lang][1]} glossary entries")
+
+
+def extract(languages, corpus=None, glossary=None, outdir='.'):
+    """Write the subsets of the corpus and glossary for each of `languages`
+
+    Both inputs are read once, one item at a time, and each item is
+    written to every subset it belongs to, so memory use does not depend
+    on the size of the inputs or on the number of languages.
+    Outputs are named after the inputs with `all_lang` replaced by the
+    lowercased language: `seediq-long-text.json` and
+    `seediq-long-text-glossary.json` for Seediq from
+    `all_lang-long-text.json` and `all_lang-long-text-glossary.json`.
+
+    Parameters
+    ----------
+    languages : list
+        `Lang` or `Lang_Dialect` names. IUs match if each part is in their
+        `meta['language']` (e.g. "賽德克語, Seediq, Tgdaya"), and glossary
+        locations if they are under a matching `Lang_Dialect/` prefix.
+    corpus, glossary : str, optional
+        Corpus (as all_lang.json) and glossary (as
+        all_lang-long-text-glossary.json) to extract from.
+
+    Returns
+    -------
+    dict
+        `{language: (number of IUs, number of glossary entries)}`
+    """
+    outdir = pathlib.Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    counts = { lang: [0, 0] for lang in languages }
+
+    if corpus is not None:
+        with ExitStack() as stack:
+            writers = [ (lang.split('_'), stack.enter_context(JSONArrayWriter(output_fp(corpus, lang, outdir))))
+                        for lang in languages ]
+            for iu in iter_json_array(corpus):
+                for parts, w in writers:
+                    if match_meta(iu['meta'].get('language', ''), parts):
+                        w.write(iu)
+            for lang, (_, w) in zip(languages, writers):
+                counts[lang][0] = w.count
+
+    if glossary is not None:
+        with ExitStack() as stack:
+            writers = [ (lang, stack.enter_context(JSONArrayWriter(output_fp(glossary, lang, outdir))))
+                        for lang in languages ]
+            for form, senses, keys in iter_json_array(glossary):
+                for lang, w in writers:
+                    subset = {}
+                    for sense, locations in senses.items():
+                        locs = [ l for l in locations if match_location(l, lang) ]
+                        if len(locs) > 0: subset[sense] = locs
+                    if len(subset) > 0:
+                        w.write([form, subset, keys])
+            for lang, w in writers:
+                counts[lang][1] = w.count
+
+    return { lang: tuple(c) for lang, c in counts.items() }
+
+
+#--------------- Helper functions -------------------#
+def output_fp(input_fp, lang, outdir):
+    name = pathlib.Path(input_fp).name
+    if name.startswith('all_lang'):
+        return outdir / name.replace('all_lang', lang.lower(), 1)
+    return outdir / f"{lang.lower()}-{name}"
+
+
+def match_meta(language, parts):
+    return all( p in language for p in parts )
+
+
+def match_location(location, lang):
+    # Seediq_Tgdaya/sdqNr-mother_iwan#3
+    lang_dialect = location.split('/')[0]
+    return lang_dialect == lang or lang_dialect.startswith(lang + '_')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#%%
+import json
+import hashlib
+import pathlib
+import argparse
+from corpus_io import JSONArrayWriter, load_all_lang
+from data import Data
+
+DATA = Data()
+STATE_VERSION = 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the glossary of the corpus from all_lang.json")
+    parser.add_argument("--corpus", default=DATA.all_lang_search, help="all_lang.json to read")
+    parser.add_argument("--full", action="store_true", help="ignore the saved state and rebuild everything")
+    args = parser.parse_args()
+
+    with GlossaryBuilder(incremental=not args.full) as builder:
+        for iu in load_all_lang(args.corpus):
+            builder.write(iu)
+    print(f"{len(builder.affected)} glossary entries updated")
+
+
+class GlossaryBuilder:
+
+    def __init__(self, outfile=DATA.glossary, state_file=DATA.glossary_state,
+                 types=('story',), incremental=True):
+        """Build the glossary from a stream of IUs (as in all_lang.json)
+
+        Glossary structure (sorted by form):
+
+        [
+            ["aku",
+                {"SG.GEN | SG.屬格": ["Amis_Ciwkangan/Amis_Nr-pear_minzhu#31", ...],
+                 "other | 其他": ["Rukai_Vedai/RukaiNr-pear_salrabu#59"]},
+                ["aku", "SG.GEN", "other", "SG.屬格", "其他"]
+            ],
+            ["become", {"變": ["Rukai_Vedai/RukaiNr-pear_salrabu#12"]}, ["become", "變"]],
+            ...
+        ]
+
+        The entries contributed by each document are saved to `state_file`.
+        On the next build, documents whose contributions did not change are
+        skipped, and only the entries of forms that changed are recomputed;
+        the rest are kept from the previous `outfile`.
+
+        Parameters
+        ----------
+        types : tuple, optional
+            Corpus types (first directory of the IU `file`) to include,
+            defaults to `('story',)` (long texts).
+        incremental : bool, optional
+            Whether to reuse the previous state, defaults to True.
+        """
+        self.outfile = pathlib.Path(outfile)
+        self.state_file = pathlib.Path(state_file)
+        self.types = set(types)
+        self.state = {"version": STATE_VERSION, "order": [], "docs": {}}
+        self.glossary = {}  # {form: [senses, search keys]}
+        if incremental and self.state_file.exists() and self.outfile.exists():
+            with open(self.state_file, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == STATE_VERSION:
+                self.state = state
+                with open(self.outfile, encoding="utf-8") as f:
+                    self.glossary = { e[0]: e[1:] for e in json.load(f) }
+        self.order = []
+        self.affected = set()
+        self._file = None
+        self._ius = []
+
+
+    def write(self, iu):
+        if iu['file'].split('/')[0] not in self.types: return
+        if iu['file'] != self._file:
+            self._flush()
+            self._file = iu['file']
+        self._ius.append(iu)
+
+
+    def close(self):
+        self._flush()
+        docs = self.state["docs"]
+        for file in set(docs) - set(self.order):
+            self.affected.update(docs.pop(file)["entries"])
+        if self.order != self.state["order"]:
+            # Locations are listed in document order
+            self.affected = set( f for d in docs.values() for f in d["entries"] ) | set(self.glossary)
+        self.state["order"] = self.order
+
+        self._update_entries()
+        self.outfile.parent.mkdir(parents=True, exist_ok=True)
+        with JSONArrayWriter(self.outfile) as w:
+            for form in sorted(self.glossary):
+                w.write([form] + self.glossary[form])
+        with open(self.state_file, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, separators=(',', ':'))
+
+
+    def _flush(self):
+        if self._file is None: return
+        entries = doc_entries(self._ius)
+        digest = hashlib.sha1(json.dumps(entries, ensure_ascii=False).encode("utf-8")).hexdigest()
+        old = self.state["docs"].get(self._file)
+        if old is None or old["hash"] != digest:
+            old_entries = old["entries"] if old is not None else {}
+            self.affected.update( f for f in entries.keys() | old_entries.keys()
+                                  if entries.get(f) != old_entries.get(f) )
+            self.state["docs"][self._file] = {"hash": digest, "entries": entries}
+        self.order.append(self._file)
+        self._ius = []
+
+
+    def _update_entries(self):
+        senses = { form: {} for form in self.affected }
+        for file in self.order:
+            entries = self.state["docs"][file]["entries"]
+            loc_prefix = location_prefix(file)
+            for form in self.affected.intersection(entries):
+                for sense, nums in entries[form].items():
+                    locs = senses[form].setdefault(sense, [])
+                    locs.extend(f"{loc_prefix}#{n}" for n in nums)
+
+        for form, form_senses in senses.items():
+            if len(form_senses) == 0:
+                self.glossary.pop(form, None)
+            else:
+                self.glossary[form] = [form_senses, search_keys(form, form_senses)]
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+#--------------- Helper functions -------------------#
+def doc_entries(ius):
+    """Contributions of a document: `{form: {"en | zh": [num, ...]}}`
+    """
+    entries = {}
+    for iu in ius:
+        for ori, en, ch in iu['gloss']:
+            # The sense joins the non-empty glosses, so tokens with only
+            # one gloss tier get `"en"` or `"zh"`; unglossed tokens are left out
+            sense = ' | '.join( g for g in (en, ch) if g != '' )
+            if ori == '' or sense == '': continue
+            # One location per occurrence, even within the same IU
+            entries.setdefault(normalize_form(ori), {}).setdefault(sense, []).append(iu['num'])
+    return entries
+
+
+def normalize_form(ori):
+    return ori.lower().replace("\\", "_fall")
+
+
+def search_keys(form, senses):
+    keys = [ form, form.replace('-', '') ]
+    for sense in senses:
+        keys += sense.split(' | ')
+    return list(dict.fromkeys(keys))
+
+
+def location_prefix(file):
+    # story/Seediq_Tgdaya/sdqNr-mother_iwan -> Seediq_Tgdaya/sdqNr-mother_iwan
+    return '/'.join(file.split('/')[-2:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import re
+
+PAT_LETTERS = re.compile(r'[a-zA-Z]+')
+
+
+class MarkerCounter:
+
+    def __init__(self, markers):
+        """Count grammatical markers (e.g. `PF`, `GEN`) in English glosses
+
+        A gloss token contains a marker if the marker appears in it not
+        preceded nor followed by an ASCII letter: `PF` is in `eat-PF=1SG`
+        and `PF.eat` but not in `PFV-eat`. For markers made only of letters
+        this means being one of the letter runs of the token, so each
+        token is split into its runs once and the markers are looked up in
+        a set, instead of searching one regex per marker. Markers with
+        other characters fall back to a regex with the same rule.
+
+        Parameters
+        ----------
+        markers : list
+            Marker inventory. Counts are returned in this order.
+        """
+        self.markers = list(markers)
+        self._labels = set( m for m in self.markers if PAT_LETTERS.fullmatch(m) )
+        self._patterns = [
+            (re.compile(f"(?<![a-zA-Z]){re.escape(m)}(?![a-zA-Z])"), m)
+            for m in self.markers if m not in self._labels
+        ]
+        self._order = { m: i for i, m in enumerate(self.markers) }
+        self._cache = {}
+
+
+    def token_markers(self, token):
+        """Markers in the inventory found in a gloss token, in inventory order
+        """
+        found = self._cache.get(token)
+        if found is None:
+            found = self._labels.intersection(PAT_LETTERS.findall(token))
+            found.update( m for pat, m in self._patterns if pat.search(token) )
+            found = self._cache[token] = tuple(sorted(found, key=self._order.get))
+        return found
+
+
+    def count(self, tokens):
+        """Number of tokens containing each marker
+
+        Returns
+        -------
+        dict
+            `{marker: count}` for every marker of the inventory.
+        """
+        counts = dict.fromkeys(self.markers, 0)
+        for token in tokens:
+            for m in self.token_markers(token):
+                counts[m] += 1
+        return counts
+
+
+    def count_text(self, text):
+        """Count markers in the English glosses of a parsed text
+        """
+        return self.count( tk[1] for iu in text["glosses"] for tk in iu[1]["gloss"] )
@@ -0,0 +1,130 @@
+#%%
+import os
+import gzip
+import lzma
+import json
+import time
+import pathlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from build_cache import file_digest, content_digest
+from data import Data
+
+DATA = Data()
+
+# Build outputs precompressed, relative to docs/
+TARGETS = [
+    "all_lang.json",
+    "all_lang-long-text-glossary.json",
+    "corpus/*.json",
+    "story/**/*.json",
+    "sentence/**/*.json",
+    "grammar/**/*.json",
+]
+FORMATS = ('.gz', '.xz')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write .gz and .xz siblings of the large build outputs")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="number of processes used to compress files (default: all CPUs)")
+    args = parser.parse_args()
+
+    report = precompress(DATA.public, TARGETS, DATA.compression_report, workers=args.workers)
+    raw = sum(r['bytes'] for r in report.values())
+    print(f"{len(report)} files, {raw / 1e6:.1f} MB raw")
+    for ext in FORMATS:
+        size = sum(r[ext]['bytes'] for r in report.values())
+        secs = sum(r[ext]['seconds'] for r in report.values())
+        print(f"{ext:<4}{size / 1e6:>8.1f} MB ({size / max(raw, 1):.1%}), {secs:.1f}s")
+
+
+def precompress(root, patterns, report_fp, workers=1):
+    """Compress the files under `root` matching `patterns`
+
+    Each file gets deterministic `.gz` and `.xz` siblings (same input, same
+    bytes), so unchanged outputs do not show up as changed on deploy. The
+    report maps each file to its sha1, raw size and, for each format, the
+    compressed size and compression time:
+
+    {
+        "all_lang.json": {
+            "sha1": "3f786850e387550fdab836ed7e6dc881de23001b",
+            "bytes": 60214405,
+            ".gz": {"bytes": 6402934, "seconds": 2.1},
+            ".xz": {"bytes": 3920118, "seconds": 31.5}
+        },
+        ...
+    }
+
+    Files whose sha1 is unchanged since the last report are skipped, and
+    compressed siblings of files no longer built are removed.
+
+    Returns
+    -------
+    dict
+        The report.
+    """
+    root = pathlib.Path(root)
+    old = {}
+    if os.path.exists(report_fp):
+        with open(report_fp, encoding="utf-8") as f:
+            old = json.load(f)
+
+    files = sorted(set( fp for p in patterns for fp in root.glob(p) ))
+    report = {}
+    todo = []
+    for fp in files:
+        name = fp.relative_to(root).as_posix()
+        prev = old.get(name)
+        if prev is not None and prev['sha1'] == file_digest(fp) \
+                and all(fp.with_name(fp.name + ext).exists() for ext in FORMATS):
+            report[name] = prev
+        else:
+            todo.append(name)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name, entry in zip(todo, pool.map(compress_file, [ root / n for n in todo ])):
+            report[name] = entry
+
+    for name in set(old) - set(report):
+        for ext in FORMATS:
+            (root / (name + ext)).unlink(missing_ok=True)
+
+    with open(report_fp, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(report.items())), f, ensure_ascii=False, indent="\t")
+    return report
+
+
+def compress_file(fp):
+    with open(fp, 'rb') as f:
+        content = f.read()
+    entry = {
+        "sha1": content_digest(content),
+        "bytes": len(content)
+    }
+    for ext in FORMATS:
+        start = time.perf_counter()
+        data = compress(content, ext)
+        entry[ext] = {
+            "bytes": len(data),
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+        out = f"{fp}{ext}"
+        with open(out + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(out + '.tmp', out)
+    return entry
+
+
+def compress(content, ext):
+    if ext == '.gz':
+        # No file name or timestamp in the header
+        return gzip.compress(content, compresslevel=9, mtime=0)
+    if ext == '.xz':
+        return lzma.compress(content, preset=9)
+    raise Exception(f"Unknown compression format: {ext}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#%%
+import re
+import json
+import random
+import shutil
+import pathlib
+import argparse
+import unicodedata
+from collections import defaultdict
+from corpus_io import load_all_lang
+from data import Data
+
+DATA = Data()
+INDEX_VERSION = 1
+FIELDS = ('form', 'en', 'ch')
+
+# Punctuation and transcription marks stripped from both ends of a key
+PAT_EDGE = re.compile(r'^[\s,.\\_=!?;:"“”()\[\]{}<>…~@/-]+|[\s,.\\_=!?;:"“”()\[\]{}<>…~@/-]+$')
+PAT_MORPHEME = re.compile(r'[-=.]+')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the sharded inverted index for full-corpus search")
+    parser.add_argument("--corpus", default=DATA.all_lang_search, help="all_lang.json to index")
+    parser.add_argument("--outdir", default=DATA.search_index, help="index directory")
+    parser.add_argument("--verify", type=int, default=0, metavar="N",
+                        help="check N random keys against a linear scan of the corpus")
+    args = parser.parse_args()
+
+    ius = load_all_lang(args.corpus)
+    build_index(ius, args.outdir)
+    if args.verify > 0:
+        verify_index(ius, args.outdir, n_keys=args.verify)
+
+
+def build_index(ius, outdir):
+    """Write an inverted index of `ius` (IUs as in all_lang.json) to `outdir`
+
+    Keys are normalized forms (from `gloss` forms and `ori`), English and
+    Chinese glosses, both whole tokens and their morphemes (split on `-`,
+    `=` and `.`). Posting lists are flat `[file_id, num, file_id, num, ...]`
+    arrays, sharded by language, field and key prefix:
+
+        <outdir>/index.json                          # files, languages and shards
+        <outdir>/<Lang_Dialect>/<field>/<shard>.json # {key: [file_id, num, ...]}
+
+    so a query only fetches `index.json` and one shard per language.
+    """
+    outdir = pathlib.Path(outdir)
+    files = []
+    file_ids = {}
+    # {lang: {field: {shard: {key: [file_id, num, ...]}}}}
+    index = defaultdict(lambda: { f: defaultdict(dict) for f in FIELDS })
+
+    for iu in ius:
+        if iu['file'] not in file_ids:
+            file_ids[iu['file']] = len(files)
+            files.append(iu['file'])
+        fid = file_ids[iu['file']]
+        lang = language_of(iu['file'])
+        for field, key in iu_keys(iu):
+            postings = index[lang][field][shard_of(key)].setdefault(key, [])
+            # An IU is only posted once per key
+            if len(postings) == 0 or postings[-2] != fid or postings[-1] != iu['num']:
+                postings += [fid, iu['num']]
+
+    if outdir.exists(): shutil.rmtree(outdir)
+    languages = {}
+    for lang, fields in index.items():
+        languages[lang] = {}
+        for field, shards in fields.items():
+            languages[lang][field] = sorted(shards)
+            shard_dir = outdir / lang / field
+            shard_dir.mkdir(parents=True, exist_ok=True)
+            for shard, postings in shards.items():
+                with open(shard_dir / f"{shard}.json", "w", encoding="utf-8") as f:
+                    json.dump(postings, f, ensure_ascii=False, separators=(',', ':'))
+
+    with open(outdir / "index.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "version": INDEX_VERSION,
+            "files": files,
+            "languages": languages
+        }, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def query(index_dir, term, field='form', languages=None):
+    """Look up `term` in the index
+
+    Parameters
+    ----------
+    index_dir : str
+        Directory written by `build_index()`.
+    term : str
+        A form, English or Chinese gloss, or a single morpheme of one.
+        It is normalized as the index keys are.
+    field : str, optional
+        One of `form`, `en` or `ch`, defaults to `form`.
+    languages : list, optional
+        `Lang_Dialect` names to search, defaults to all languages.
+
+    Returns
+    -------
+    list
+        Sorted `(file, num)` of the matching IUs.
+    """
+    index_dir = pathlib.Path(index_dir)
+    key = normalize_key(term)
+    if key is None: return []
+    with open(index_dir / "index.json", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    shard = shard_of(key)
+    hits = set()
+    for lang, fields in meta['languages'].items():
+        if languages is not None and lang not in languages: continue
+        if shard not in fields.get(field, []): continue
+        with open(index_dir / lang / field / f"{shard}.json", encoding="utf-8") as f:
+            postings = json.load(f).get(key, [])
+        for i in range(0, len(postings), 2):
+            hits.add( (meta['files'][postings[i]], postings[i + 1]) )
+    return sorted(hits)
+
+
+def scan(ius, term, field='form', languages=None):
+    """Reference implementation of `query()`: a linear scan over all IUs
+    """
+    key = normalize_key(term)
+    hits = set()
+    for iu in ius:
+        if languages is not None and language_of(iu['file']) not in languages: continue
+        if (field, key) in set(iu_keys(iu)):
+            hits.add( (iu['file'], iu['num']) )
+    return sorted(hits)
+
+
+def verify_index(ius, index_dir, n_keys=100, seed=0):
+    keys = sorted(set( k for iu in ius for k in iu_keys(iu) ))
+    sample = random.Random(seed).sample(keys, min(n_keys, len(keys)))
+    for field, key in sample:
+        if query(index_dir, key, field) != scan(ius, key, field):
+            raise Exception(f"Index and linear scan differ for {field}:{key}")
+    print(f"Index matches a linear scan on {len(sample)} keys")
+
+
+#--------------- Helper functions -------------------#
+def iu_keys(iu):
+    """Yield the `(field, key)` pairs under which an IU is indexed
+    """
+    for form, en, ch in iu['gloss']:
+        yield from token_keys('form', form)
+        yield from token_keys('en', en)
+        yield from token_keys('ch', ch)
+    for form in iu['ori']:
+        yield from token_keys('form', form)
+
+
+def token_keys(field, token):
+    key = normalize_key(token)
+    if key is None: return
+    yield field, key
+    morphemes = PAT_MORPHEME.split(key)
+    if len(morphemes) > 1:
+        for m in morphemes:
+            m = normalize_key(m)
+            if m is not None: yield field, m
+
+
+def normalize_key(s):
+    s = PAT_EDGE.sub('', unicodedata.normalize('NFC', s).lower())
+    return s if s != '' else None
+
+
+def shard_of(key):
+    """ASCII letters and digits get a shard each, other characters are
+    grouped by Unicode block of 256 code points
+    """
+    c = key[0]
+    if c.isascii() and c.isalnum(): return c
+    return f"u{ord(c) >> 8:04x}"
+
+
+def language_of(file):
+    # story/Seediq_Tgdaya/sdqNr-mother_iwan -> Seediq_Tgdaya
+    return file.split('/')[-2]
+
+
+if __name__ == "__main__":
+    main()
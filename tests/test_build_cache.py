@@ -0,0 +1,51 @@
+import json
+from build_cache import BuildManifest
+
+SRC = 'raw-data/story/Seediq_Tgdaya/sdqNr-mother.txt'
+
+
+def build(manifest, out, digest, valid):
+    """Record a parse of SRC as GlossProcessor does"""
+    manifest.record(SRC, digest, valid, [])
+    if valid:
+        out.write_text(json.dumps({'digest': digest}), encoding="utf-8")
+        manifest.set_outputs(SRC, [out])
+
+
+def test_valid_to_invalid_removes_outputs(tmp_path):
+    out = tmp_path / "sdqNr-mother.json"
+    manifest = BuildManifest(tmp_path / "manifest.json", "1")
+    build(manifest, out, "a", True)
+    manifest.save()
+
+    manifest = BuildManifest(tmp_path / "manifest.json", "1")
+    build(manifest, out, "b", False)
+    assert not out.exists()
+    assert manifest.files[SRC]['outputs'] == []
+    assert manifest.lookup(SRC, "b") is not None
+
+
+def test_reparse_keeps_outputs(tmp_path):
+    out = tmp_path / "sdqNr-mother.json"
+    manifest = BuildManifest(tmp_path / "manifest.json", "1")
+    build(manifest, out, "a", True)
+    build(manifest, out, "b", True)
+    assert json.loads(out.read_text(encoding="utf-8")) == {'digest': 'b'}
+    assert manifest.lookup(SRC, "b")['outputs'] == [str(out)]
+
+
+def test_moved_output_is_removed(tmp_path):
+    old, new = tmp_path / "old.json", tmp_path / "new.json"
+    manifest = BuildManifest(tmp_path / "manifest.json", "1")
+    build(manifest, old, "a", True)
+    build(manifest, new, "a", True)
+    assert not old.exists() and new.exists()
+
+
+def test_prune_removes_outputs(tmp_path):
+    out = tmp_path / "sdqNr-mother.json"
+    manifest = BuildManifest(tmp_path / "manifest.json", "1")
+    build(manifest, out, "a", True)
+    manifest.prune([])
+    assert not out.exists()
+    assert SRC not in manifest.files
@@ -0,0 +1,32 @@
+import io
+import zipfile
+from docx_reader import iter_paragraphs
+
+NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def make_docx(body):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as z:
+        z.writestr('word/document.xml', f'<w:document {NS}><w:body>{body}</w:body></w:document>')
+    return buf.getvalue()
+
+
+def p(text):
+    return f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>'
+
+
+def test_body_paragraphs_only():
+    body = (
+        p('#e Yaku') +
+        '<w:tbl><w:tr><w:tc>' + p('in table') + '</w:tc></w:tr></w:tbl>' +
+        '<w:sdt><w:sdtContent>' + p('in sdt') + '</w:sdtContent></w:sdt>' +
+        '<w:p><w:hyperlink><w:r><w:t>m-eniq</w:t><w:tab/></w:r></w:hyperlink><w:r><w:br/><w:t>alang</w:t></w:r></w:p>' +
+        '<w:sectPr/>'
+    )
+    assert list(iter_paragraphs(make_docx(body))) == ['#e Yaku', 'm-eniq\t\nalang']
+
+
+def test_many_tables():
+    body = ''.join( p(i) + '<w:tbl><w:tr><w:tc>' + p('x') + '</w:tc></w:tr></w:tbl>' for i in range(1000) )
+    assert list(iter_paragraphs(make_docx(body))) == [ str(i) for i in range(1000) ]
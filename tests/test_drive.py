@@ -0,0 +1,59 @@
+import pytest
+from benchmarks.fake_drive import FakeDriveService, FakeHttpError
+from traverse_files import Drive, is_transient
+
+
+@pytest.fixture
+def service():
+    # Listings span several pages and a fifth of the requests fail
+    return FakeDriveService(page_size=2, fail_rate=0.2, seed=1)
+
+
+def make_drive(service, root, **kwargs):
+    return Drive(service, root_id=root, workers=4, retries=10, backoff=0, **kwargs)
+
+
+def test_concurrent_same_tree(service):
+    root = service.add_tree(n_types=3, n_languages=3, n_texts=5)
+    drive = make_drive(service, root)
+    assert drive.list_child_concurrent(root) == drive.list_child_recursive(root)
+    assert service.failures > 0
+
+
+def test_list_all_txt(service):
+    root = service.add_tree(n_types=3, n_languages=3, n_texts=5)
+    txts = { i: f for i, f in service.files_.items() if f['mimeType'] == 'text/plain' }
+    listed = make_drive(service, root).list_all_txt()
+    assert service.failures > 0
+    assert len(listed) == len(txts) == 3 * 3 * 5
+    assert set(f['id'] for f in listed) == set(txts)
+    for f in listed:
+        assert f['fp'].split('/')[-1] == txts[f['id']]['name']
+        assert f['modifiedTime'] == txts[f['id']]['modifiedTime']
+
+
+def test_get_file_content(service):
+    root = service.add_tree(n_types=1, n_languages=2, n_texts=5)
+    drive = make_drive(service, root)
+    for txt in drive.list_all_txt():
+        assert drive.get_file_content(txt['id']) == service.content[txt['id']].decode('utf-8')
+    assert service.failures > 0
+
+
+def test_retries_exhausted():
+    service = FakeDriveService(fail_rate=1)
+    root = service.add_tree(n_types=1, n_languages=1, n_texts=1)
+    drive = Drive(service, root_id=root, retries=3, backoff=0)
+    with pytest.raises(FakeHttpError):
+        drive.list_child(root)
+    assert service.requests['list'] == 4
+
+
+def test_is_transient():
+    assert is_transient(FakeHttpError(503))
+    assert is_transient(FakeHttpError(429))
+    assert is_transient(FakeHttpError(403, b'{"error": {"errors": [{"reason": "rateLimitExceeded"}]}}'))
+    assert is_transient(ConnectionError())
+    assert not is_transient(FakeHttpError(403, b'{"error": {"errors": [{"reason": "forbidden"}]}}'))
+    assert not is_transient(FakeHttpError(404))
+    assert not is_transient(ValueError())
@@ -0,0 +1,112 @@
+import re
+import random
+import unicodedata
+import pytest
+from search_index import build_index, query
+
+# Characters stripped from both ends of a key, written out independently
+# of search_index.PAT_EDGE
+EDGE = ' \t\n,.\\_=!?;:"“”()[]{}<>…~@/-'
+
+CORPUS = [
+    {"file": "story/Seediq_Tgdaya/sdqNr-mother", "num": "1",
+     "ori": ["Yaku", "m-eniq", "alang,"],
+     "gloss": [["Yaku", "1SG", "我"], ["m-eniq", "AF-live", "主焦-住"], ["alang,", "village", "部落"]]},
+    {"file": "story/Seediq_Tgdaya/sdqNr-mother", "num": "2",
+     "ori": ["tama=mu", "...(0.8)"],
+     "gloss": [["tama=mu", "father=1SG.GEN", "父親=1SG.屬格"], ["...(0.8)", "", ""]]},
+    # IU numbers repeat within a text
+    {"file": "story/Seediq_Tgdaya/sdqNr-mother", "num": "2",
+     "ori": ["yaku"],
+     "gloss": [["yaku", "1SG", "我"]]},
+    {"file": "sentence/Amis_Xiuguluan/amiNr-s1", "num": "1",
+     "ori": ["kaku", "(YAKU)"],
+     "gloss": [["kaku", "1SG.NOM", "我.主格"]]},
+]
+
+
+def expected_hits(ius, term, field, languages=None):
+    """Linear scan of the raw `gloss` and `ori` tokens"""
+    col = {'form': 0, 'en': 1, 'ch': 2}[field]
+    term = normalize(term)
+    hits = set()
+    for iu in ius:
+        if languages is not None and iu['file'].split('/')[-2] not in languages: continue
+        tokens = [ g[col] for g in iu['gloss'] ]
+        if field == 'form': tokens += iu['ori']
+        for token in tokens:
+            key = normalize(token)
+            if key and (key == term or term in map(normalize, re.split(r'[-=.]+', key))):
+                hits.add( (iu['file'], iu['num']) )
+    return sorted(hits)
+
+
+def normalize(s):
+    return unicodedata.normalize('NFC', s).lower().strip(EDGE)
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    build_index(CORPUS, tmp_path / "index")
+    return tmp_path / "index"
+
+
+@pytest.mark.parametrize("term, field, hits", [
+    ("yaku", "form", [("sentence/Amis_Xiuguluan/amiNr-s1", "1"),
+                      ("story/Seediq_Tgdaya/sdqNr-mother", "1"), ("story/Seediq_Tgdaya/sdqNr-mother", "2")]),
+    ("m-eniq", "form", [("story/Seediq_Tgdaya/sdqNr-mother", "1")]),
+    ("eniq", "form", [("story/Seediq_Tgdaya/sdqNr-mother", "1")]),
+    ("alang", "form", [("story/Seediq_Tgdaya/sdqNr-mother", "1")]),
+    ("GEN", "en", [("story/Seediq_Tgdaya/sdqNr-mother", "2")]),
+    ("1sg", "en", [("sentence/Amis_Xiuguluan/amiNr-s1", "1"),
+                   ("story/Seediq_Tgdaya/sdqNr-mother", "1"), ("story/Seediq_Tgdaya/sdqNr-mother", "2")]),
+    ("我", "ch", [("sentence/Amis_Xiuguluan/amiNr-s1", "1"),
+                 ("story/Seediq_Tgdaya/sdqNr-mother", "1"), ("story/Seediq_Tgdaya/sdqNr-mother", "2")]),
+    ("主焦", "ch", [("story/Seediq_Tgdaya/sdqNr-mother", "1")]),
+    ("village", "form", []),
+    ("...", "form", []),
+])
+def test_query(index_dir, term, field, hits):
+    assert query(index_dir, term, field) == hits
+    assert expected_hits(CORPUS, term, field) == hits
+
+
+def test_query_languages(index_dir):
+    assert query(index_dir, "yaku", languages=["Amis_Xiuguluan"]) == [("sentence/Amis_Xiuguluan/amiNr-s1", "1")]
+    assert query(index_dir, "yaku", languages=["Rukai_Vedai"]) == []
+
+
+def test_query_matches_scan(tmp_path):
+    ius = random_corpus(random.Random(0), n_ius=400)
+    build_index(ius, tmp_path / "index")
+
+    terms = set()
+    for iu in ius:
+        for form, en, ch in iu['gloss']:
+            for field, token in [('form', form), ('en', en), ('ch', ch)]:
+                terms.add( (field, token) )
+                terms.update( (field, m) for m in re.split(r'[-=.]+', token) )
+        terms.update( ('form', form) for form in iu['ori'] )
+    terms.update( [('form', 'absent'), ('en', 'ABSENT'), ('ch', '無')] )
+
+    for field, term in sorted(terms):
+        if not normalize(term): continue
+        assert query(tmp_path / "index", term, field) == expected_hits(ius, term, field), (field, term)
+        assert query(tmp_path / "index", term, field, languages=["Amis_Xiuguluan"]) \
+            == expected_hits(ius, term, field, languages=["Amis_Xiuguluan"]), (field, term)
+
+
+def random_corpus(rng, n_ius):
+    forms = ["yaku", "Yaku,", "m-eniq", "ga=ku", "tama=mu", "kumu.\\", "(alang)", "eh", "...(0.8)", "..",
+             "n-eyah=ku,_", "[XX]", "Ēmi", "ēmi", "kaku!"]
+    ens = ["1SG", "AF-live", "PART=1SG.NOM", "father=1SG.GEN", "PN", "village", "FIL", "PFV-AF.come",
+           "[XX]", "", "Mother"]
+    chs = ["我", "主焦-住", "語助=我.主格", "父親=1SG.屬格", "人名", "部落", "", "來。"]
+    files = [ f"{t}/{lang}/text{i}" for t in ["story", "sentence"]
+              for lang in ["Seediq_Tgdaya", "Amis_Xiuguluan"] for i in range(3) ]
+    ius = []
+    for _ in range(n_ius):
+        gloss = [ [rng.choice(forms), rng.choice(ens), rng.choice(chs)] for _ in range(rng.randint(1, 6)) ]
+        ori = [ g[0] for g in gloss ] + ([rng.choice(forms)] if rng.random() < 0.3 else [])
+        ius.append({"file": rng.choice(files), "num": str(rng.randint(1, 20)), "ori": ori, "gloss": gloss})
+    return ius
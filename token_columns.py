@@ -0,0 +1,234 @@
+#%%
+import sys
+import json
+import mmap
+import pathlib
+import argparse
+from array import array
+from collections import Counter
+from corpus_io import load_all_lang
+from tokenizer import is_DM_token
+from data import Data
+
+DATA = Data()
+COLUMNS_VERSION = 1
+FIELDS = ('form', 'en', 'ch')
+
+# (column, array typecode): one row per token
+COLUMNS = (
+    ('doc', 'I'),     # index into the document table (`file` of the IU)
+    ('num', 'I'),     # IU number in the document
+    ('pos', 'I'),     # token position in the IU
+    ('form', 'I'),    # ids into the string dictionaries
+    ('en', 'I'),
+    ('ch', 'I'),
+    ('is_DM', 'B'),
+)
+# Rows buffered in memory before they are appended to the column files
+CHUNK_ROWS = 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the tokens of all_lang.json as memory-mappable columns")
+    parser.add_argument("--corpus", default=DATA.all_lang_search, help="all_lang.json to export")
+    parser.add_argument("--outdir", default=DATA.token_columns, help="output directory")
+    args = parser.parse_args()
+
+    with TokenColumnWriter(args.outdir) as w:
+        for iu in load_all_lang(args.corpus):
+            w.write(iu)
+    print(f"{w.rows} tokens, {len(w.docs)} documents")
+
+
+class TokenColumnWriter:
+
+    def __init__(self, outdir):
+        """Write the tokens of IUs (as in all_lang.json) as columns
+
+        Every form, English and Chinese gloss is interned into a string
+        dictionary and each token becomes one row of fixed-width integer
+        columns, stored as raw little-endian arrays:
+
+            <outdir>/columns.json    # row count, column files and types
+            <outdir>/strings.json    # {"doc": [file, ...], "form": [...], "en": [...], "ch": [...]}
+            <outdir>/<column>.bin    # one per column in COLUMNS
+
+        `is_DM` is 1 for the tokens `tokenizer.align()` marks as DMs (see
+        `tokenizer.is_DM_token`). Read them with `TokenColumns`.
+        """
+        self.outdir = pathlib.Path(outdir)
+        self.outdir.mkdir(parents=True, exist_ok=True)
+        self.rows = 0
+        self.docs = []
+        self._doc_ids = {}
+        self.strings = { f: [] for f in FIELDS }
+        self._ids = { f: {} for f in FIELDS }
+        self._chunk = { name: array(code) for name, code in COLUMNS }
+        self._files = { name: open(self.outdir / f"{name}.bin.tmp", "wb") for name, _ in COLUMNS }
+
+
+    def write(self, item):
+        doc = self._doc_ids.get(item['file'])
+        if doc is None:
+            doc = self._doc_ids[item['file']] = len(self.docs)
+            self.docs.append(item['file'])
+
+        chunk = self._chunk
+        for pos, token in enumerate(item['gloss']):
+            chunk['doc'].append(doc)
+            chunk['num'].append(item['num'])
+            chunk['pos'].append(pos)
+            for field, s in zip(FIELDS, token):
+                chunk[field].append(self._intern(field, s))
+            chunk['is_DM'].append(is_DM_token(token))
+        if len(chunk['doc']) >= CHUNK_ROWS:
+            self._flush()
+
+
+    def _intern(self, field, s):
+        i = self._ids[field].get(s)
+        if i is None:
+            i = self._ids[field][s] = len(self.strings[field])
+            self.strings[field].append(s)
+        return i
+
+
+    def _flush(self):
+        self.rows += len(self._chunk['doc'])
+        for name, code in COLUMNS:
+            chunk = self._chunk[name]
+            if sys.byteorder != 'little': chunk.byteswap()
+            chunk.tofile(self._files[name])
+            self._chunk[name] = array(code)
+
+
+    def close(self):
+        self._flush()
+        for name, _ in COLUMNS:
+            self._files[name].close()
+            fp = self.outdir / f"{name}.bin"
+            pathlib.Path(f"{fp}.tmp").replace(fp)
+
+        with open(self.outdir / "strings.json", "w", encoding="utf-8") as f:
+            json.dump({"doc": self.docs, **self.strings}, f, ensure_ascii=False, separators=(',', ':'))
+        with open(self.outdir / "columns.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "version": COLUMNS_VERSION,
+                "rows": self.rows,
+                "byteorder": "little",
+                "columns": { name: {
+                    "file": f"{name}.bin",
+                    "typecode": code,
+                    "itemsize": array(code).itemsize
+                } for name, code in COLUMNS }
+            }, f, ensure_ascii=False, indent="\t")
+
+
+    def abort(self):
+        for name, _ in COLUMNS:
+            self._files[name].close()
+            pathlib.Path(self._files[name].name).unlink()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class TokenColumns:
+
+    def __init__(self, outdir=DATA.token_columns):
+        """Read the columns written by `TokenColumnWriter`
+
+        Column files are memory-mapped, so opening is instant and only the
+        pages that are read are loaded. `column()` returns a zero-copy
+        `memoryview`, or a NumPy array if NumPy is installed and asked for:
+
+            cols = TokenColumns()
+            form = cols.column('form', numpy=True)
+            lexical = form[cols.column('is_DM', numpy=True) == 0]
+            counts = np.bincount(lexical, minlength=len(cols.strings['form']))
+
+        Parameters
+        ----------
+        outdir : str
+            Directory written by `TokenColumnWriter`.
+        """
+        self.outdir = pathlib.Path(outdir)
+        with open(self.outdir / "columns.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta["version"] > COLUMNS_VERSION:
+            raise Exception(f"Unsupported token columns version: {self.meta['version']}")
+        if self.meta["byteorder"] != sys.byteorder:
+            raise Exception("Token columns were written with a different byte order")
+        with open(self.outdir / "strings.json", encoding="utf-8") as f:
+            self.strings = json.load(f)
+        self._maps = {}
+        self._ids = {}
+
+
+    def __len__(self):
+        return self.meta["rows"]
+
+
+    def column(self, name, numpy=False):
+        col = self.meta["columns"][name]
+        if array(col["typecode"]).itemsize != col["itemsize"]:
+            raise Exception(f"Column {name} has items of {col['itemsize']} bytes on this platform")
+        if name not in self._maps:
+            with open(self.outdir / col["file"], "rb") as f:
+                # mmap cannot map empty files
+                self._maps[name] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) \
+                    if self.meta["rows"] > 0 else b''
+        if numpy:
+            import numpy as np
+            return np.frombuffer(self._maps[name], dtype=np.dtype(col["typecode"]))
+        return memoryview(self._maps[name]).cast(col["typecode"])
+
+
+    def frequencies(self, field='form', skip_DM=True):
+        """Token frequency of each string of `field`
+
+        Returns
+        -------
+        collections.Counter
+            `{string: count}`
+        """
+        ids = self.column(field)
+        if skip_DM:
+            ids = [ i for i, dm in zip(ids, self.column('is_DM')) if not dm ]
+        strings = self.strings[field]
+        return Counter({ strings[i]: n for i, n in Counter(ids).items() })
+
+
+    def lookup(self, field, s):
+        """Id of string `s` in the dictionary of `field`, or None
+        """
+        if field not in self._ids:
+            self._ids[field] = { v: i for i, v in enumerate(self.strings[field]) }
+        return self._ids[field].get(s)
+
+
+    def close(self):
+        # Fails while arrays returned by `column()` are still referenced
+        for m in self._maps.values():
+            if isinstance(m, mmap.mmap): m.close()
+        self._maps = {}
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+if __name__ == "__main__":
+    main()
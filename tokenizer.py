@@ -14,61 +14,62 @@
 #%%
 import re
 import logging
+from functools import lru_cache
+
+PAT_UNKNOWN = re.compile(r'\[X+\]')
+PAT_DM = re.compile(r'^[^a-z,]+$')
 
 
 def align(ori, en="", ch="", gloss_id=""):
-    ori = [ x for x in ori.strip().split() ]
-    en = [ t for t in en.strip().split() if (t != "." and t != "") ]
-    ch = [ t for t in ch.strip().split() if (t != "." and t != "") ]
+    ori = ori.split()
+    en = [ t for t in en.split() if t != "." ]
+    ch = [ t for t in ch.split() if t != "." ]
 
     if len(en) != len(ch):
         logging.warning(f"Diff. num of tokens in EN & CH annot:\t{gloss_id}")
         #raise Exception("Invalid Gloss Format!") 
 
-    tokens = [{'ori': ori_tk, 'en': '', 'ch': '', 'is_DM': True} for ori_tk in ori]
-    
+    # Tokens left once the annotations run out are pure DMs with empty annotation
+    n_anno = min(len(en), len(ch))
+    tokens = []
     anno_idx = 0
-    for i, ori_tk in enumerate(ori):
-        if anno_idx == len(en) or anno_idx == len(ch):
-            return tokens
-        en_tk = get_arr_val(en, anno_idx, "")
-        ch_tk = get_arr_val(ch, anno_idx, "")
-
-        tk = {
-            'ori': ori_tk,
-            'en': '',
-            'ch': '',
-            'is_DM': is_pureDM(ori_tk)
-        }
+    for ori_tk in ori:
+        if anno_idx == n_anno:
+            break
         if is_pureDM(ori_tk):
-            # Assign if duplicate DM markers in annotaion
-            if en_tk == ori_tk and ch_tk == ori_tk:
-                tk['en'], tk['ch'] = '', ''
+            # Skip duplicate DM markers in annotaion
+            if en[anno_idx] == ori_tk and ch[anno_idx] == ori_tk:
                 anno_idx += 1
+            tokens.append({'ori': ori_tk, 'en': '', 'ch': '', 'is_DM': True})
         else:
-            tk['en'], tk['ch'] = en_tk, ch_tk
+            tokens.append({'ori': ori_tk, 'en': en[anno_idx], 'ch': ch[anno_idx], 'is_DM': False})
             anno_idx += 1
 
-        tokens[i] = tk
+    for ori_tk in ori[len(tokens):]:
+        tokens.append({'ori': ori_tk, 'en': '', 'ch': '', 'is_DM': True})
 
     return tokens 
-        
 
 
+def is_DM_token(token):
+    """`is_DM` of an aligned `(ori, en, ch)` token, as set by `align()`
+
+    `align()` leaves the annotations empty exactly for the tokens it marks
+    as DMs (pure DMs and tokens left once the annotations run out), so the
+    flag can be recovered from the triples saved in all_lang.json.
+    """
+    return token[1] == '' and token[2] == ''
+
+
+@lru_cache(maxsize=2**16)
 def is_pureDM(x):
     # Specific rules
-    if re.match(r'\[X+\]', x): return False
+    if PAT_UNKNOWN.match(x): return False
     
     # Default rule
-    if re.match(r'^[^a-z,]+$', x): return True
+    if PAT_DM.match(x): return True
     else: return False
 
 
-def get_arr_val(arr, idx, default):
-    if idx < len(arr):
-        return arr[idx]
-    return default
-
-
 def replace_backslash(x):
     return x.replace("\\", "_FALL_")
\ No newline at end of file
@@ -1,19 +1,84 @@
 # https://github.com/lopentu/keke/blob/master/dialogue/chatai/bin/download_data.py
+import time
+import random
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from download_cache import DownloadCache
+
+ROOT_FOLDER_ID = '1anXf0owlXjyu_qc7mF-_ayNJGfo_0CiV'
+FOLDER = 'application/vnd.google-apps.folder'
+LIST_FIELDS = 'nextPageToken, files(id, name, mimeType, parents, modifiedTime)'
+PAGE_SIZE = 1000
+# HTTP statuses worth retrying: rate limits and server errors
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+
 class Drive():
 
-    def __init__(self, service):
+    def __init__(self, service, service_factory=None, root_id=ROOT_FOLDER_ID, workers=8,
+                 retries=5, backoff=1.0, cache=None):
+        """
+        Parameters
+        ----------
+        service : googleapiclient.discovery.Resource
+            Drive v3 service.
+        service_factory : callable, optional
+            Returns a new Drive service. The service objects of
+            googleapiclient are not thread-safe, so when given, each worker
+            thread makes its own service; otherwise `service` is shared.
+        root_id : str, optional
+            Folder holding the `<type>/<Lang_Dialect>/*.txt` tree.
+        workers : int, optional
+            Number of concurrent requests when listing folders.
+        retries : int, optional
+            Number of times a request failing with a transient error
+            (rate limit, server error, connection error) is retried.
+        backoff : float, optional
+            Seconds before the first retry. The delay doubles at each
+            retry, with random jitter.
+        cache : download_cache.DownloadCache, optional
+            Store of the downloaded contents, reused while the files are
+            not modified. Defaults to an in-memory store.
+        """
         self.service = service
+        self.service_factory = service_factory
+        self.root_id = root_id
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = DownloadCache(None) if cache is None else cache
         self.folders = {}  # {id: {id, name, parents, modifiedTime} }
-        self.file_content = {}  # {id: content}
+        self.listed = {}  # {id: {id, name, mimeType, parents, modifiedTime} } as of the last listing
+        self._local = threading.local()
+
+
+    @property
+    def api(self):
+        """Drive service for the current thread
+        """
+        if self.service_factory is None or threading.current_thread() is threading.main_thread():
+            return self.service
+        if not hasattr(self._local, 'service'):
+            self._local.service = self.service_factory()
+        return self._local.service
+
+
+    def execute(self, request):
+        """Execute an API request, retrying transient errors with exponential backoff
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                return request.execute()
+            except Exception as e:
+                if attempt == self.retries or not is_transient(e):
+                    raise
+                time.sleep(self.backoff * 2**attempt * random.uniform(0.5, 1.0))
 
-    # Cache
-    def read_cache(self, folders, file_content):
-        self.folders = folders
-        self.file_content = file_content
 
     # Get .txt files
     def list_all_txt(self):
-        tree = self.list_child_recursive('1anXf0owlXjyu_qc7mF-_ayNJGfo_0CiV')
+        tree = self.list_child_concurrent(self.root_id)
 
         files = []
         for dir_type in tree:
@@ -21,7 +86,8 @@ class Drive():
                 for txt in dir_lang['child']:
                     files.append({
                         'id': txt['id'],
-                        'fp': f"{dir_type['name']}/{dir_lang['name']}/{txt['name']}"
+                        'fp': f"{dir_type['name']}/{dir_lang['name']}/{txt['name']}",
+                        'modifiedTime': txt['modifiedTime']
                     })
         
         return files
@@ -32,7 +98,7 @@ class Drive():
 
         ls = []
         for f in files:
-            if f['mimeType'] != 'application/vnd.google-apps.folder':
+            if f['mimeType'] != FOLDER:
                 if f['mimeType'] == 'text/plain':
                     ls.append(f)
             else:
@@ -47,15 +113,57 @@ class Drive():
         return ls
 
 
+    def list_child_concurrent(self, id_):
+        """Same tree as `list_child_recursive()`, listing folders breadth-first
+
+        Each listed folder submits its subfolders to a pool of
+        `self.workers` threads, so the folders of a level are listed
+        concurrently instead of one request at a time.
+        """
+        root = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = { pool.submit(self.list_child, id_): root }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ls = pending.pop(future)
+                    for f in future.result():
+                        if f['mimeType'] != FOLDER:
+                            if f['mimeType'] == 'text/plain':
+                                ls.append(f)
+                        else:
+                            subdir = []
+                            ls.append({
+                                "mimeType": f["mimeType"],
+                                "name": f["name"],
+                                "id": f["id"],
+                                "child": subdir
+                                })
+                            pending[pool.submit(self.list_child, f['id'])] = subdir
+
+        return root
+
+
     def list_child(self, id_):
+        """All the files in a folder, following every page of the listing
+        """
         q = f"'{id_}' in parents"
-        resp = self.service.files().list(q=q,
+        files = []
+        page_token = None
+        while True:
+            resp = self.execute(self.api.files().list(q=q,
                                     spaces='drive',
                                     corpora='allDrives',
-                                    fields='nextPageToken, files(id, name, mimeType, parents, modifiedTime)',
+                                    fields=LIST_FIELDS,
+                                    pageSize=PAGE_SIZE,
+                                    pageToken=page_token,
                                     includeItemsFromAllDrives=True,
-                                    supportsAllDrives=True).execute()
-        return resp.get('files', [])
+                                    supportsAllDrives=True))
+            files += resp.get('files', [])
+            self.listed.update( (f['id'], f) for f in resp.get('files', []) )
+            page_token = resp.get('nextPageToken')
+            if page_token is None:
+                return files
 
 
 
@@ -79,10 +187,10 @@ class Drive():
         if (not force) and file_id in self.folders:
             return self.folders[file_id]
         else:
-            file = self.service.files().get(
+            file = self.execute(self.api.files().get(
                 fileId=file_id,
                 fields='id, name, mimeType, parents, modifiedTime',
-                supportsTeamDrives=True).execute()
+                supportsTeamDrives=True))
             
             # update cache
             self.folders[file['id']] = file
@@ -90,18 +198,42 @@ class Drive():
             return file
     
 
-    def get_file_content(self, file_id):
-        if file_id not in self.file_content:
-            self.file_content[file_id] = self.service.files().get_media(
-                fileId=file_id).execute().decode('UTF-8')
-        else:
-            ometa = self.get_file_meta(file_id)
-            nmeta = self.get_file_meta(file_id, force=True)
-            if ometa['modifiedTime'] != nmeta['modifiedTime']:
-                self.file_content[file_id] = self.service.files().get_media(
-                fileId=file_id).execute().decode('UTF-8')
-        
-        return self.file_content[file_id]
+    def is_modified(self, file_id):
+        """Whether the cached content of a file is missing or outdated
+
+        The cached content is current if the file's `modifiedTime` in the
+        last folder listing is the one it had when its content was fetched
+        (kept in `self.cache`), so no request is made for listed files.
+        Files not in the listing are checked with a metadata request.
+        """
+        entry = self.cache.entry(file_id)
+        if entry is None:
+            return True
+        nmeta = self.listed.get(file_id) or self.get_file_meta(file_id, force=True)
+        return entry['modifiedTime'] != nmeta['modifiedTime']
+
+
+    def get_file_content(self, file_id, path=None):
+        """Content of a file, fetched only if the cached content is outdated
+
+        Parameters
+        ----------
+        file_id : str
+            Drive file id.
+        path : str, optional
+            Path of the file in the corpus tree, recorded in the cache.
+        """
+        if not self.is_modified(file_id):
+            content = self.cache.get(file_id)
+            if content is not None:
+                return content
+
+        # Metadata before content: if the file changes in between, the
+        # older modifiedTime is recorded and the file is fetched next time
+        meta = self.listed.get(file_id) or self.get_file_meta(file_id)
+        content = self.execute(self.api.files().get_media(fileId=file_id)).decode('UTF-8')
+        self.cache.put(file_id, content, meta['modifiedTime'], path)
+        return content
 
 
     def get_file_content_by_folderid(self, folder_id):
@@ -109,4 +241,18 @@ class Drive():
             if ('parents' in fmeta) and (fmeta['parents'][0] == folder_id):
                 return self.get_file_content(fid)
         
-        return None
\ No newline at end of file
+        return None
+
+
+def is_transient(error):
+    """Whether a failed request may succeed if retried
+    """
+    if isinstance(error, (ConnectionError, TimeoutError, socket.timeout)):
+        return True
+    # googleapiclient.errors.HttpError
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    if status is None:
+        return False
+    if int(status) == 403:
+        return 'ratelimitexceeded' in str(getattr(error, 'content', b'')).lower()
+    return int(status) in TRANSIENT_STATUS